@@ -5,6 +5,7 @@ from api.dependencies import (
     get_db,
     get_exchange,
     hash_password,
+    remember_api_key,
     verify_password,
 )
 from config import settings
@@ -66,7 +67,7 @@ async def register(
             detail="Username already taken",
         )
 
-    pw_hash = hash_password(req.password)
+    pw_hash = await hash_password(req.password)
     db_user = await create_user(db, req.username, pw_hash)
     await db.commit()
 
@@ -77,6 +78,7 @@ async def register(
         cash=settings.STARTING_CASH,
     )
     exchange.register_user(mem_user)
+    remember_api_key(db_user.api_key, db_user.id)
 
     token = create_jwt(db_user.id)
     return RegisterResponse(
@@ -94,7 +96,7 @@ async def login(
     db: AsyncSession = Depends(get_db),
 ):
     db_user = await get_user_by_username(db, req.username)
-    if not db_user or not verify_password(req.password, db_user.password_hash):
+    if not db_user or not await verify_password(req.password, db_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
@@ -1,4 +1,9 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from uuid import UUID
 
 import bcrypt
@@ -7,6 +12,7 @@ from config import settings
 from core.user import User
 from db.crud import get_user_by_api_key, get_user_by_id
 from db.database import get_session
+from db.writer import DBWriter
 from engine.exchange import Exchange
 from fastapi import Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -14,13 +20,57 @@ from sqlalchemy.ext.asyncio import AsyncSession
 # Singleton exchange — set in main.py lifespan
 _exchange: Exchange | None = None
 
+# Background DB writer — set in main.py lifespan; None means write inline
+_db_writer: DBWriter | None = None
+
+# API key → user_id, filled on register and on first DB lookup. Keys never
+# change, so entries stay valid for the life of the process.
+_api_key_to_uid: dict[str, str] = {}
+
+# bcrypt worker processes — created on first use, shut down in main.py lifespan
+_bcrypt_pool: ProcessPoolExecutor | None = None
+
 
 def set_exchange(exchange: Exchange):
     global _exchange
     _exchange = exchange
+    _api_key_to_uid.clear()
+
+
+def set_db_writer(writer: DBWriter | None):
+    global _db_writer
+    _db_writer = writer
+
+
+# Dependency accessors are `async def` on purpose: FastAPI runs plain `def`
+# dependencies in its threadpool, which would cost a thread hop per request.
+async def get_db_writer() -> DBWriter | None:
+    # A writer whose worker has died can't commit; write inline instead
+    if _db_writer is not None and not _db_writer.running:
+        return None
+    return _db_writer
 
 
-def get_exchange() -> Exchange:
+def remember_api_key(api_key: str, user_id: str):
+    _api_key_to_uid[api_key] = user_id
+
+
+_parse_uuid = lru_cache(maxsize=4096)(UUID)
+
+
+async def resolve_api_key(db: AsyncSession, api_key: str) -> str | None:
+    """user_id for an API key: from the cache, else one DB lookup that fills
+    it. Shared by HTTP and WebSocket auth so both resolve keys the same way."""
+    user_id = _api_key_to_uid.get(api_key)
+    if user_id is None:
+        db_user = await get_user_by_api_key(db, api_key)
+        if db_user:
+            user_id = db_user.id
+            remember_api_key(api_key, user_id)
+    return user_id
+
+
+async def get_exchange() -> Exchange:
     if _exchange is None:
         raise RuntimeError("Exchange not initialized")
     return _exchange
@@ -31,12 +81,36 @@ async def get_db():
         yield session
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+def _get_bcrypt_pool() -> ProcessPoolExecutor:
+    global _bcrypt_pool
+    if _bcrypt_pool is None:
+        _bcrypt_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _bcrypt_pool
+
+
+def shutdown_bcrypt_pool():
+    global _bcrypt_pool
+    if _bcrypt_pool is not None:
+        _bcrypt_pool.shutdown(wait=False, cancel_futures=True)
+        _bcrypt_pool = None
 
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return bcrypt.checkpw(password.encode(), password_hash.encode())
+async def hash_password(password: str) -> str:
+    # bcrypt is CPU-bound (2^cost rounds) — run it in a worker process so
+    # concurrent registrations hash in parallel across cores
+    salt = bcrypt.gensalt(settings.BCRYPT_COST)
+    loop = asyncio.get_running_loop()
+    hashed = await loop.run_in_executor(
+        _get_bcrypt_pool(), bcrypt.hashpw, password.encode(), salt
+    )
+    return hashed.decode()
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _get_bcrypt_pool(), bcrypt.checkpw, password.encode(), password_hash.encode()
+    )
 
 
 def create_jwt(user_id: str) -> str:
@@ -47,14 +121,27 @@ def create_jwt(user_id: str) -> str:
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
 
-def decode_jwt(token: str) -> str | None:
+@lru_cache(maxsize=10_000)
+def _verify_jwt(token: str) -> tuple[str | None, float] | None:
+    """Verify signature once per token; returns (sub, exp) or None if invalid."""
     try:
         payload = jwt.decode(
             token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM]
         )
-        return payload.get("sub")
     except jwt.PyJWTError:
         return None
+    return payload.get("sub"), payload.get("exp", float("inf"))
+
+
+def decode_jwt(token: str) -> str | None:
+    claims = _verify_jwt(token)
+    if claims is None:
+        return None
+    sub, exp = claims
+    # Cached tokens still expire — re-check exp on every hit
+    if exp <= time.time():
+        return None
+    return sub
 
 
 async def get_current_user(
@@ -70,11 +157,9 @@ async def get_current_user(
         token = authorization[7:]
         user_id = decode_jwt(token)
 
-    # Fall back to API key
+    # Fall back to API key (cached after the first DB lookup)
     if user_id is None and x_api_key:
-        db_user = await get_user_by_api_key(db, x_api_key)
-        if db_user:
-            user_id = db_user.id
+        user_id = await resolve_api_key(db, x_api_key)
 
     if user_id is None:
         raise HTTPException(
@@ -83,7 +168,7 @@ async def get_current_user(
         )
 
     # Get in-memory user from exchange
-    mem_user = exchange.get_user(UUID(user_id))
+    mem_user = exchange.get_user(_parse_uuid(user_id))
     if mem_user is None:
         # Try loading from DB
         db_user = await get_user_by_id(db, user_id)
@@ -1,35 +1,88 @@
+import asyncio
+import heapq
+import logging
+
 from api.dependencies import get_exchange
 from engine.exchange import Exchange
 from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+
+logger = logging.getLogger("market-sim.leaderboard")
 
 router = APIRouter(prefix="/api", tags=["leaderboard"])
 
+# Refreshed by refresh_leaderboard_loop (started in main.py lifespan) so
+# requests are served without recomputing
+_leaderboard_cache: dict = {"exchange": None, "data": None}
 
-@router.get("/leaderboard")
-async def get_leaderboard(exchange: Exchange = Depends(get_exchange)):
-    # Calculate total value for each non-market-maker user
-    entries = []
-    for user in exchange.users.values():
-        if user.is_market_maker:
-            continue
-
-        total_value = user.cash
-        holdings = []
-        for ticker, qty in user.portfolio.items():
-            if qty > 0:
-                price = exchange.get_current_price(ticker) or 0.0
-                total_value += price * qty
-                holdings.append({"ticker": ticker, "quantity": qty})
-
-        entries.append(
-            {
-                "user_id": str(user.user_id),
-                "username": user.username,
-                "cash": round(user.cash, 2),
-                "holdings": holdings,
-                "total_value": round(total_value, 2),
-            }
+
+class LeaderboardHolding(BaseModel):
+    ticker: str
+    quantity: int
+
+
+class LeaderboardEntry(BaseModel):
+    user_id: str
+    username: str
+    cash: float
+    holdings: list[LeaderboardHolding]
+    total_value: float
+
+
+class LeaderboardResponse(BaseModel):
+    leaderboard: list[LeaderboardEntry]
+
+
+def compute_leaderboard(exchange: Exchange) -> dict:
+    # One price snapshot per computation, not a lookup per (user, holding)
+    prices = exchange.price_snapshot()
+
+    # Value every non-market-maker user, then format only the top 50
+    valued = (
+        (
+            user.cash
+            + sum(
+                prices.get(ticker, 0.0) * qty
+                for ticker, qty in user.portfolio.items()
+                if qty > 0
+            ),
+            user,
         )
+        for user in exchange.users.values()
+        if not user.is_market_maker
+    )
+    top = heapq.nlargest(50, valued, key=lambda entry: entry[0])
+
+    entries = [
+        {
+            "user_id": user.user_id_str,
+            "username": user.username,
+            "cash": round(user.cash, 2),
+            "holdings": [
+                {"ticker": ticker, "quantity": qty}
+                for ticker, qty in user.portfolio.items()
+                if qty > 0
+            ],
+            "total_value": round(total_value, 2),
+        }
+        for total_value, user in top
+    ]
+    return {"leaderboard": entries}
 
-    entries.sort(key=lambda e: e["total_value"], reverse=True)
-    return {"leaderboard": entries[:50]}
+
+async def refresh_leaderboard_loop(exchange: Exchange, interval: float = 1.0):
+    while True:
+        try:
+            data = compute_leaderboard(exchange)
+            _leaderboard_cache.update(exchange=exchange, data=data)
+        except Exception:
+            logger.exception("Leaderboard refresh failed")
+        await asyncio.sleep(interval)
+
+
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+async def get_leaderboard(exchange: Exchange = Depends(get_exchange)):
+    if _leaderboard_cache["exchange"] is exchange:
+        return _leaderboard_cache["data"]
+    # Refresher not running for this exchange (e.g. tests) — compute inline
+    return compute_leaderboard(exchange)
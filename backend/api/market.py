@@ -1,9 +1,12 @@
+import time
 from datetime import datetime, timedelta, timezone
 
-from api.dependencies import get_db, get_exchange
-from db.crud import get_trades_for_ticker
+from api.dependencies import get_db, get_db_writer, get_exchange
+from db.crud import get_candles_for_ticker
+from db.writer import DBWriter
 from engine.exchange import Exchange
 from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,19 +14,34 @@ router = APIRouter(prefix="/api/market", tags=["market"])
 
 VALID_INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "1d": 86400}
 
+# /tickers is polled heavily — reuse the last snapshot while the exchange is
+# unchanged, or for up to TICKERS_CACHE_TTL seconds while it is trading
+TICKERS_CACHE_TTL = 0.25
+_tickers_cache: dict = {"exchange": None, "version": -1, "ts": 0.0, "data": None}
 
-@router.get("/tickers")
+
+class TickerQuote(BaseModel):
+    current_price: float | None
+    best_bid: float | None
+    best_ask: float | None
+
+
+class TickersResponse(BaseModel):
+    tickers: dict[str, TickerQuote]
+
+
+@router.get("/tickers", response_model=TickersResponse)
 async def get_tickers(exchange: Exchange = Depends(get_exchange)):
-    tickers = {}
-    for ticker in exchange.order_books:
-        price = exchange.get_current_price(ticker)
-        book = exchange.order_books[ticker]
-        tickers[ticker] = {
-            "current_price": price,
-            "best_bid": book.bids[0].price if book.bids else None,
-            "best_ask": book.asks[0].price if book.asks else None,
-        }
-    return {"tickers": tickers}
+    now = time.monotonic()
+    cache = _tickers_cache
+    if cache["exchange"] is exchange and (
+        cache["version"] == exchange.version or now - cache["ts"] < TICKERS_CACHE_TTL
+    ):
+        return cache["data"]
+
+    data = {"tickers": exchange.quote_snapshot()}
+    cache.update(exchange=exchange, version=exchange.version, ts=now, data=data)
+    return data
 
 
 @router.get("/{ticker}")
@@ -36,36 +54,36 @@ async def get_ticker(ticker: str, exchange: Exchange = Depends(get_exchange)):
     return {
         "ticker": ticker,
         "current_price": price,
-        "best_bid": book.bids[0].price if book.bids else None,
-        "best_ask": book.asks[0].price if book.asks else None,
-        "bid_depth": len(book.bids),
-        "ask_depth": len(book.asks),
+        "best_bid": book.best_price("buy"),
+        "best_ask": book.best_price("sell"),
+        "bid_depth": book.order_count("buy"),
+        "ask_depth": book.order_count("sell"),
     }
 
 
-@router.get("/{ticker}/orderbook")
+class PriceLevel(BaseModel):
+    price: float
+    quantity: int
+
+
+class OrderBookResponse(BaseModel):
+    ticker: str
+    bids: list[PriceLevel]
+    asks: list[PriceLevel]
+
+
+@router.get("/{ticker}/orderbook", response_model=OrderBookResponse)
 async def get_orderbook(ticker: str, exchange: Exchange = Depends(get_exchange)):
     if ticker not in exchange.order_books:
-        return {"error": f"Ticker '{ticker}' not found"}
+        return JSONResponse({"error": f"Ticker '{ticker}' not found"})
 
     book = exchange.order_books[ticker]
 
-    # Aggregate by price level (no user IDs exposed)
-    bid_levels: dict[float, int] = {}
-    for order in book.bids:
-        bid_levels[order.price] = bid_levels.get(order.price, 0) + order.quantity
-
-    ask_levels: dict[float, int] = {}
-    for order in book.asks:
-        ask_levels[order.price] = ask_levels.get(order.price, 0) + order.quantity
-
+    # Levels are pre-aggregated by the order book (no user IDs exposed)
     return {
         "ticker": ticker,
-        "bids": [
-            {"price": p, "quantity": q}
-            for p, q in sorted(bid_levels.items(), reverse=True)
-        ],
-        "asks": [{"price": p, "quantity": q} for p, q in sorted(ask_levels.items())],
+        "bids": [{"price": p, "quantity": q} for p, q in book.price_levels("buy")],
+        "asks": [{"price": p, "quantity": q} for p, q in book.price_levels("sell")],
     }
 
 
@@ -92,6 +110,7 @@ async def get_history(
     end: datetime | None = Query(default=None),
     exchange: Exchange = Depends(get_exchange),
     db: AsyncSession = Depends(get_db),
+    writer: DBWriter | None = Depends(get_db_writer),
 ):
     if ticker not in exchange.order_books:
         raise HTTPException(
@@ -110,55 +129,22 @@ async def get_history(
     if start is None:
         start = end - timedelta(hours=24)
 
-    trades = await get_trades_for_ticker(db, ticker, start=start, end=end)
-
-    # Bucket trades into candles
-    interval_seconds = VALID_INTERVALS[interval]
-    candles: list[CandleResponse] = []
-    epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
-
-    def _ensure_tz(dt: datetime) -> datetime:
-        return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
-
-    def _bucket_for(dt: datetime) -> datetime:
-        dt = _ensure_tz(dt)
-        s = (dt - epoch).total_seconds()
-        return epoch + timedelta(seconds=(s // interval_seconds) * interval_seconds)
-
-    if trades:
-        bucket_trades: list = []
-        bucket_start = _bucket_for(trades[0].created_at)
-
-        for trade in trades:
-            trade_bucket = _bucket_for(trade.created_at)
-            if trade_bucket != bucket_start:
-                # Flush previous bucket
-                if bucket_trades:
-                    candles.append(
-                        CandleResponse(
-                            timestamp=bucket_start.isoformat(),
-                            open=bucket_trades[0].price,
-                            high=max(t.price for t in bucket_trades),
-                            low=min(t.price for t in bucket_trades),
-                            close=bucket_trades[-1].price,
-                            volume=sum(t.quantity for t in bucket_trades),
-                        )
-                    )
-                bucket_start = trade_bucket
-                bucket_trades = []
-            bucket_trades.append(trade)
-
-        # Flush last bucket
-        if bucket_trades:
-            candles.append(
-                CandleResponse(
-                    timestamp=bucket_start.isoformat(),
-                    open=bucket_trades[0].price,
-                    high=max(t.price for t in bucket_trades),
-                    low=min(t.price for t in bucket_trades),
-                    close=bucket_trades[-1].price,
-                    volume=sum(t.quantity for t in bucket_trades),
-                )
-            )
-
-    return HistoryResponse(ticker=ticker, interval=interval, candles=candles)
+    if writer is not None:
+        await writer.drain()
+    rows = await get_candles_for_ticker(
+        db, ticker, VALID_INTERVALS[interval], start=start, end=end
+    )
+    # Plain dicts: response_model validates and serializes them in one pass
+    candles = [
+        {
+            "timestamp": datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(),
+            "open": o,
+            "high": h,
+            "low": low,
+            "close": c,
+            "volume": v,
+        }
+        for ts, o, h, low, c, v in rows
+    ]
+
+    return {"ticker": ticker, "interval": interval, "candles": candles}
@@ -2,11 +2,29 @@ from api.dependencies import get_current_user, get_exchange
 from core.user import User
 from engine.exchange import Exchange
 from fastapi import APIRouter, Depends
+from pydantic import BaseModel
 
 router = APIRouter(prefix="/api", tags=["portfolio"])
 
 
-@router.get("/portfolio")
+class HoldingResponse(BaseModel):
+    ticker: str
+    quantity: int
+    current_price: float
+    value: float
+
+
+class PortfolioResponse(BaseModel):
+    user_id: str
+    username: str
+    cash: float
+    buying_power: float
+    escrowed_cash: float
+    holdings: list[HoldingResponse]
+    total_value: float
+
+
+@router.get("/portfolio", response_model=PortfolioResponse)
 async def get_portfolio(
     user: User = Depends(get_current_user),
     exchange: Exchange = Depends(get_exchange),
@@ -14,9 +32,10 @@ async def get_portfolio(
     holdings = []
     holdings_value = 0.0
 
+    prices = exchange.price_snapshot()
     for ticker, qty in user.portfolio.items():
         if qty > 0:
-            price = exchange.get_current_price(ticker) or 0.0
+            price = prices.get(ticker, 0.0)
             value = price * qty
             holdings_value += value
             holdings.append(
@@ -28,15 +47,11 @@ async def get_portfolio(
                 }
             )
 
-    # Compute escrowed cash from resting buy orders in the live order books
-    escrowed_cash = 0.0
-    for ticker, book in exchange.order_books.items():
-        for order in book.bids:
-            if order.user_id == user.user_id:
-                escrowed_cash += order.price * order.quantity
+    # Cash locked in resting buy orders (tracked by the exchange)
+    escrowed_cash = user.escrowed_cash
 
     return {
-        "user_id": str(user.user_id),
+        "user_id": user.user_id_str,
         "username": user.username,
         "cash": round(user.cash, 2),
         "buying_power": round(user.cash, 2),
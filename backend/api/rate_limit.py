@@ -6,7 +6,12 @@ from fastapi import HTTPException, status
 
 
 class RateLimiter:
-    """Sliding window rate limiter keyed by user ID."""
+    """Token bucket rate limiter keyed by user ID.
+
+    Each user may burst up to `max_requests`; tokens refill continuously at
+    `max_requests / window_seconds` per second. Only (tokens, last_refill) is
+    stored per user.
+    """
 
     def __init__(
         self,
@@ -15,24 +20,41 @@ class RateLimiter:
     ):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self._requests: dict[UUID, list[float]] = {}
+        self._refill_rate = max_requests / window_seconds
+        self._buckets: dict[UUID, tuple[float, float]] = {}
+        self._last_prune = time.monotonic()
 
     def check(self, user_id: UUID) -> None:
         now = time.monotonic()
-        timestamps = self._requests.get(user_id, [])
-        cutoff = now - self.window_seconds
-        timestamps = [t for t in timestamps if t > cutoff]
-        if len(timestamps) >= self.max_requests:
+        if now - self._last_prune >= self.window_seconds:
+            self._prune(now)
+
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            tokens = float(self.max_requests)
+        else:
+            prev_tokens, last_refill = bucket
+            tokens = min(
+                self.max_requests, prev_tokens + (now - last_refill) * self._refill_rate
+            )
+        if tokens < 1:
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail="Rate limit exceeded. Try again later.",
             )
-        timestamps.append(now)
-        self._requests[user_id] = timestamps
+        self._buckets[user_id] = (tokens - 1, now)
+
+    def _prune(self, now: float) -> None:
+        """Drop buckets idle for a full window — they would be full again anyway."""
+        cutoff = now - self.window_seconds
+        self._buckets = {
+            uid: bucket for uid, bucket in self._buckets.items() if bucket[1] > cutoff
+        }
+        self._last_prune = now
 
 
 _limiter = RateLimiter()
 
 
-def get_rate_limiter() -> RateLimiter:
+async def get_rate_limiter() -> RateLimiter:
     return _limiter
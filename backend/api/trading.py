@@ -1,37 +1,41 @@
-from datetime import datetime
+import functools
+from datetime import datetime, timezone
+from typing import Literal
 from uuid import UUID
 
-from api.dependencies import get_current_user, get_db, get_exchange
+from api.dependencies import get_current_user, get_db, get_db_writer, get_exchange
 from api.rate_limit import RateLimiter, get_rate_limiter
 from core.order import Order
+from core.trade import Trade
 from core.user import User
 from db.crud import (
+    apply_order_fills,
     cancel_order_db,
     get_open_orders,
     get_order_by_id,
     get_user_trades,
     record_order,
-    record_trade,
+    record_trades,
+    restore_dirty_flags,
     sync_user_to_db,
-    update_order_fill,
+    sync_users_to_db,
 )
+from db.writer import DBWriter, WriteJob
 from engine.exchange import Exchange
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveFloat, PositiveInt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/api", tags=["trading"])
 
 
-VALID_TIF = {"GTC", "IOC", "FOK"}
-
-
 class OrderRequest(BaseModel):
+    # Checked by pydantic-core while parsing the body; bad input gets a 422
     ticker: str
-    side: str
-    price: float
-    quantity: int
-    time_in_force: str = "GTC"
+    side: Literal["buy", "sell"]
+    price: PositiveFloat
+    quantity: PositiveInt
+    time_in_force: Literal["GTC", "IOC", "FOK"] = "GTC"
 
 
 class TradeResponse(BaseModel):
@@ -54,40 +58,93 @@ class OrderResponse(BaseModel):
     trades: list[TradeResponse]
 
 
+async def _persist(db: AsyncSession, writer: DBWriter | None, job: WriteJob) -> None:
+    """Hand a write job to the background writer, or run and commit it inline
+    when no writer is running (e.g. under tests)."""
+    if writer is None:
+        try:
+            await job(db)
+            await db.commit()
+        except Exception:
+            restore_dirty_flags(db)
+            raise
+    else:
+        writer.submit(job)
+
+
+async def _persist_placed_order(
+    db: AsyncSession,
+    exchange: Exchange,
+    user: User,
+    req: OrderRequest,
+    order: Order,
+    trades: list[Trade],
+    order_status: str,
+    filled_qty: int,
+    placed_at: datetime,
+) -> None:
+    await record_order(
+        db,
+        order_id=order.order_id_str,
+        user_id=user.user_id_str,
+        ticker=req.ticker,
+        side=req.side,
+        price=req.price,
+        quantity=req.quantity,
+        filled_quantity=filled_qty,
+        status=order_status,
+        time_in_force=req.time_in_force,
+        created_at=placed_at,
+    )
+
+    await record_trades(db, trades)
+
+    # Sync the user and each distinct non-MM counterparty once
+    counterparty_ids = {
+        uid for trade in trades for uid in (trade.buyer_id, trade.seller_id)
+    }
+    counterparty_ids.discard(user.user_id)
+    to_sync = [user]
+    for uid in counterparty_ids:
+        counterparty = exchange.get_user(uid)
+        if counterparty and not counterparty.is_market_maker:
+            to_sync.append(counterparty)
+    await sync_users_to_db(db, to_sync)
+
+    # Update filled_quantity for resting orders that were matched
+    resting_fills: dict[str, int] = {}
+    for trade in trades:
+        resting_id = (
+            trade.sell_order_id_str if req.side == "buy" else trade.buy_order_id_str
+        )
+        if resting_id != order.order_id_str:
+            prev = resting_fills.get(resting_id, 0)
+            resting_fills[resting_id] = prev + trade.quantity
+
+    await apply_order_fills(db, resting_fills)
+
+
+async def _persist_cancel(db: AsyncSession, order_id: str, user: User) -> None:
+    await cancel_order_db(db, order_id)
+    # Persist refunded balance
+    await sync_user_to_db(db, user)
+
+
 @router.post("/orders", response_model=OrderResponse)
 async def place_order(
     req: OrderRequest,
     user: User = Depends(get_current_user),
     exchange: Exchange = Depends(get_exchange),
     db: AsyncSession = Depends(get_db),
+    writer: DBWriter | None = Depends(get_db_writer),
     limiter: RateLimiter = Depends(get_rate_limiter),
 ):
     limiter.check(user.user_id)
-    if req.side not in ("buy", "sell"):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Side must be 'buy' or 'sell'",
-        )
-    if req.price <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Price must be positive",
-        )
-    if req.quantity <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Quantity must be positive",
-        )
     if req.ticker not in exchange.order_books:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Ticker '{req.ticker}' not found",
         )
-    if req.time_in_force not in VALID_TIF:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"time_in_force must be one of: {', '.join(sorted(VALID_TIF))}",
-        )
 
     order = Order(
         price=round(req.price, 2),
@@ -96,6 +153,8 @@ async def place_order(
         time_in_force=req.time_in_force,
     )
 
+    # Stamped now: the row may be written well after, behind the writer queue
+    placed_at = datetime.now(timezone.utc)
     try:
         trades, order_status = await exchange.place_order(req.ticker, order, req.side)
     except ValueError as e:
@@ -104,79 +163,39 @@ async def place_order(
             detail=str(e),
         )
 
-    filled_qty = sum(t.quantity for t in trades)
-
-    # Persist to DB
-    await record_order(
-        db,
-        order_id=str(order.order_id),
-        user_id=str(user.user_id),
-        ticker=req.ticker,
-        side=req.side,
-        price=req.price,
-        quantity=req.quantity,
-        filled_quantity=filled_qty,
-        status=order_status,
-        time_in_force=req.time_in_force,
-    )
-
-    for trade in trades:
-        await record_trade(
-            db,
-            trade_id=str(trade.trade_id),
-            ticker=trade.ticker,
-            price=trade.price,
-            quantity=trade.quantity,
-            buyer_id=str(trade.buyer_id),
-            seller_id=str(trade.seller_id),
-            buy_order_id=str(trade.buy_order_id),
-            sell_order_id=str(trade.sell_order_id),
+    # One pass over the fills for both the total and the response items.
+    # Everything here is server-built, so skip Pydantic validation.
+    filled_qty = 0
+    trade_responses = []
+    for t in trades:
+        filled_qty += t.quantity
+        trade_responses.append(
+            TradeResponse.model_construct(
+                trade_id=t.trade_id_str,
+                ticker=t.ticker,
+                price=t.price,
+                quantity=t.quantity,
+                buyer_id=t.buyer_id_str,
+                seller_id=t.seller_id_str,
+            )
         )
 
-    # Sync user state
-    await sync_user_to_db(db, user)
-
-    # Also sync counterparties
-    for trade in trades:
-        for uid in (trade.buyer_id, trade.seller_id):
-            if uid != user.user_id:
-                counterparty = exchange.get_user(uid)
-                if counterparty and not counterparty.is_market_maker:
-                    await sync_user_to_db(db, counterparty)
-
-    # Update filled_quantity for resting orders that were matched
-    resting_fills: dict[str, int] = {}
-    for trade in trades:
-        resting_id = str(
-            trade.sell_order_id if req.side == "buy" else trade.buy_order_id
-        )
-        if resting_id != str(order.order_id):
-            prev = resting_fills.get(resting_id, 0)
-            resting_fills[resting_id] = prev + trade.quantity
-
-    for resting_id, additional_fill in resting_fills.items():
-        db_resting = await get_order_by_id(db, resting_id)
-        if db_resting is not None:
-            new_filled = db_resting.filled_quantity + additional_fill
-            new_status = "filled" if new_filled >= db_resting.quantity else "partial"
-            await update_order_fill(db, resting_id, new_filled, new_status)
-
-    await db.commit()
-
-    trade_responses = [
-        TradeResponse(
-            trade_id=str(t.trade_id),
-            ticker=t.ticker,
-            price=t.price,
-            quantity=t.quantity,
-            buyer_id=str(t.buyer_id),
-            seller_id=str(t.seller_id),
-        )
-        for t in trades
-    ]
+    # Persist to DB — queued behind the response when the writer is running
+    job = functools.partial(
+        _persist_placed_order,
+        exchange=exchange,
+        user=user,
+        req=req,
+        order=order,
+        trades=trades,
+        order_status=order_status,
+        filled_qty=filled_qty,
+        placed_at=placed_at,
+    )
+    await _persist(db, writer, job)
 
-    return OrderResponse(
-        order_id=str(order.order_id),
+    return OrderResponse.model_construct(
+        order_id=order.order_id_str,
         ticker=req.ticker,
         side=req.side,
         price=req.price,
@@ -199,37 +218,48 @@ async def cancel_order(
     user: User = Depends(get_current_user),
     exchange: Exchange = Depends(get_exchange),
     db: AsyncSession = Depends(get_db),
+    writer: DBWriter | None = Depends(get_db_writer),
     limiter: RateLimiter = Depends(get_rate_limiter),
 ):
     limiter.check(user.user_id)
-    # 1. Look up order in DB
+    # 1. Look up order in DB (after any queued writes for it have landed)
+    if writer is not None:
+        await writer.drain()
     db_order = await get_order_by_id(db, order_id)
-    if db_order is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found",
-        )
+    if db_order is not None:
+        ticker, side = db_order.ticker, db_order.side
+        owner_id, order_status = db_order.user_id, db_order.status
+    else:
+        # Its row may be parked behind a failed write; the book still has it
+        resting = exchange.find_order(order_id)
+        if resting is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found",
+            )
+        ticker, order, side = resting
+        owner_id, order_status = order.user_id_str, "open"
 
     # 2. Ownership check
-    if db_order.user_id != str(user.user_id):
+    if owner_id != user.user_id_str:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Cannot cancel another user's order",
         )
 
     # 3. Status check — only open or partial orders can be cancelled
-    if db_order.status not in ("open", "partial"):
+    if order_status not in ("open", "partial"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot cancel order with status '{db_order.status}'",
+            detail=f"Cannot cancel order with status '{order_status}'",
         )
 
     # 4. Remove from in-memory book and refund escrow
     try:
         await exchange.cancel_order(
-            ticker=db_order.ticker,
+            ticker=ticker,
             order_id=UUID(order_id),
-            side=db_order.side,
+            side=side,
             user_id=user.user_id,
         )
     except ValueError as e:
@@ -238,13 +268,10 @@ async def cancel_order(
             detail=str(e),
         )
 
-    # 5. Update DB status
-    await cancel_order_db(db, order_id)
-
-    # 6. Persist refunded balance
-    await sync_user_to_db(db, user)
-
-    await db.commit()
+    # 5. Update DB status and refunded balance
+    await _persist(
+        db, writer, functools.partial(_persist_cancel, order_id=order_id, user=user)
+    )
 
     return CancelResponse(
         order_id=order_id,
@@ -264,16 +291,31 @@ class OpenOrderResponse(BaseModel):
     created_at: datetime
 
 
+def _cursor(before: datetime | None, before_id: str) -> tuple[datetime, str] | None:
+    """Keyset cursor from the last row of the previous page. An empty id
+    sorts before every real id, so `before` alone means strictly older."""
+    if before is None:
+        return None
+    return (before, before_id)
+
+
 @router.get("/orders", response_model=list[OpenOrderResponse])
 async def list_orders(
     limit: int = Query(default=50, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    before: datetime | None = Query(default=None),
+    before_id: str = Query(default=""),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    writer: DBWriter | None = Depends(get_db_writer),
 ):
-    orders = await get_open_orders(db, str(user.user_id), limit, offset)
+    if writer is not None:
+        await writer.drain()
+    cursor = _cursor(before, before_id)
+    orders = await get_open_orders(db, user.user_id_str, limit, offset, cursor)
+    # Rows come straight from our own tables — skip per-row validation
     return [
-        OpenOrderResponse(
+        OpenOrderResponse.model_construct(
             order_id=o.id,
             ticker=o.ticker,
             side=o.side,
@@ -303,23 +345,32 @@ async def list_trades(
     ticker: str | None = Query(default=None),
     limit: int = Query(default=50, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
+    before: datetime | None = Query(default=None),
+    before_id: str = Query(default=""),
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    writer: DBWriter | None = Depends(get_db_writer),
 ):
+    if writer is not None:
+        await writer.drain()
+    uid = user.user_id_str
+    cursor = _cursor(before, before_id)
     trades = await get_user_trades(
-        db, str(user.user_id), ticker=ticker, limit=limit, offset=offset
+        db, uid, ticker=ticker, limit=limit, offset=offset, before=cursor
     )
-    uid = str(user.user_id)
-    return [
-        TradeHistoryResponse(
-            trade_id=t.id,
-            ticker=t.ticker,
-            price=t.price,
-            quantity=t.quantity,
-            side="buy" if t.buyer_id == uid else "sell",
-            counterparty_id=t.seller_id if t.buyer_id == uid else t.buyer_id,
-            order_id=t.buy_order_id if t.buyer_id == uid else t.sell_order_id,
-            created_at=t.created_at,
+    responses = []
+    for t in trades:
+        is_buyer = t.buyer_id == uid
+        responses.append(
+            TradeHistoryResponse.model_construct(
+                trade_id=t.id,
+                ticker=t.ticker,
+                price=t.price,
+                quantity=t.quantity,
+                side="buy" if is_buyer else "sell",
+                counterparty_id=t.seller_id if is_buyer else t.buyer_id,
+                order_id=t.buy_order_id if is_buyer else t.sell_order_id,
+                created_at=t.created_at,
+            )
         )
-        for t in trades
-    ]
+    return responses
@@ -4,7 +4,7 @@ import random
 
 from core.order import Order
 from core.user import User
-from db.crud import cancel_order_db, record_order, record_trade
+from db.crud import cancel_orders_db, record_orders, record_trades
 from engine.exchange import Exchange
 
 logger = logging.getLogger("market-sim.bot")
@@ -22,19 +22,23 @@ class MarketMakerBot:
         user: User,
         session_factory=None,
         interval: float = 2.0,
+        persist_orders: bool = False,
     ):
         self.exchange = exchange
         self.user = user
         self.session_factory = session_factory
+        # MM quotes are transient liquidity — only written when asked to
+        self.persist_orders = persist_orders
         self.interval = interval
         self.spread_pct = 0.01  # 1% spread
+        # ticker -> (price quoted around, quantity, bid order, ask order)
+        self._quotes: dict[str, tuple[float, int, Order, Order]] = {}
 
     async def run(self):
         logger.info("Market maker bot running")
         while True:
             try:
-                for ticker in list(self.exchange.order_books.keys()):
-                    await self._quote_ticker(ticker)
+                await self._run_cycle()
                 await asyncio.sleep(self.interval)
             except asyncio.CancelledError:
                 logger.info("Market maker bot shutting down")
@@ -43,10 +47,45 @@ class MarketMakerBot:
                 logger.exception("Market maker error")
                 await asyncio.sleep(self.interval)
 
+    async def _run_cycle(self):
+        # Tickers lock independently, so quote them all concurrently and
+        # persist the whole cycle in one session afterwards
+        tickers = self.exchange.tickers
+        results = await asyncio.gather(
+            *(self._place_quotes(ticker) for ticker in tickers),
+            return_exceptions=True,
+        )
+        writes = []
+        for ticker, result in zip(tickers, results):
+            if isinstance(result, Exception):
+                logger.error("Market maker error on %s", ticker, exc_info=result)
+            elif result is not None:
+                writes.append(result)
+        await self._persist(writes)
+
+    def _quote_is_current(self, ticker: str, price: float) -> bool:
+        """True if the last quote is still fully resting and the price has
+        moved less than half the spread since it was placed."""
+        last = self._quotes.get(ticker)
+        if last is None:
+            return False
+        quoted_price, quantity, bid_order, ask_order = last
+        if bid_order.quantity != quantity or ask_order.quantity != quantity:
+            return False  # (partly) filled — replenish
+        return abs(price - quoted_price) < 0.5 * self.spread_pct * quoted_price
+
     async def _quote_ticker(self, ticker: str):
+        write = await self._place_quotes(ticker)
+        if write is not None:
+            await self._persist([write])
+
+    async def _place_quotes(self, ticker: str):
+        """Re-quote `ticker` if needed; returns what to persist, or None."""
         price = self.exchange.get_current_price(ticker)
         if price is None:
-            return
+            return None
+        if self._quote_is_current(ticker, price):
+            return None
 
         # Cancel stale orders before placing new ones
         cancelled = await self.exchange.cancel_all_for_user(ticker, self.user.user_id)
@@ -75,57 +114,56 @@ class MarketMakerBot:
         ask_trades, ask_status = await self.exchange.place_order(
             ticker, ask_order, "sell"
         )
+        self._quotes[ticker] = (price, quantity, bid_order, ask_order)
+
+        # Every MM trade has a real user on the other side, so trades are
+        # always kept; the quotes themselves only on request.
+        trades = bid_trades + ask_trades
+        if not (self.persist_orders or trades):
+            return None
+        quotes = (
+            (bid_order, "buy", bid_trades, bid_status),
+            (ask_order, "sell", ask_trades, ask_status),
+        )
+        return ticker, quantity, cancelled, quotes, trades
 
-        # Persist to DB
-        if self.session_factory is not None:
-            try:
-                async with self.session_factory() as session:
-                    # Record cancelled stale orders
-                    for order, _side in cancelled:
-                        await cancel_order_db(session, str(order.order_id))
-
-                    # Record bid order
-                    bid_filled = sum(t.quantity for t in bid_trades)
-                    await record_order(
-                        session,
-                        order_id=str(bid_order.order_id),
-                        user_id=str(self.user.user_id),
-                        ticker=ticker,
-                        side="buy",
-                        price=bid_price,
-                        quantity=quantity,
-                        filled_quantity=bid_filled,
-                        status=bid_status,
-                    )
-
-                    # Record ask order
-                    ask_filled = sum(t.quantity for t in ask_trades)
-                    await record_order(
-                        session,
-                        order_id=str(ask_order.order_id),
-                        user_id=str(self.user.user_id),
-                        ticker=ticker,
-                        side="sell",
-                        price=ask_price,
-                        quantity=quantity,
-                        filled_quantity=ask_filled,
-                        status=ask_status,
-                    )
-
-                    # Record trades
-                    for trade in bid_trades + ask_trades:
-                        await record_trade(
-                            session,
-                            trade_id=str(trade.trade_id),
-                            ticker=trade.ticker,
-                            price=trade.price,
-                            quantity=trade.quantity,
-                            buyer_id=str(trade.buyer_id),
-                            seller_id=str(trade.seller_id),
-                            buy_order_id=str(trade.buy_order_id),
-                            sell_order_id=str(trade.sell_order_id),
-                        )
-
-                    await session.commit()
-            except Exception:
-                logger.exception("Failed to persist MM orders/trades for %s", ticker)
+    async def _persist(self, writes):
+        if self.session_factory is None or not writes:
+            return
+        try:
+            async with self.session_factory() as session:
+                if self.persist_orders:
+                    await self._record_quotes(session, writes)
+                await record_trades(
+                    session, [trade for write in writes for trade in write[4]]
+                )
+                await session.commit()
+        except Exception:
+            logger.exception(
+                "Failed to persist MM orders/trades for %s",
+                ", ".join(write[0] for write in writes),
+            )
+
+    async def _record_quotes(self, session, writes):
+        # Cancelled stale orders, then the new bids and asks, one batch each
+        await cancel_orders_db(
+            session,
+            [order.order_id_str for write in writes for order, _side in write[2]],
+        )
+        await record_orders(
+            session,
+            [
+                {
+                    "id": order.order_id_str,
+                    "user_id": self.user.user_id_str,
+                    "ticker": ticker,
+                    "side": side,
+                    "price": order.price,
+                    "quantity": quantity,  # order.quantity is the unfilled rest
+                    "filled_quantity": sum(t.quantity for t in trades),
+                    "status": order_status,
+                }
+                for ticker, quantity, _cancelled, quotes, _trades in writes
+                for order, side, trades, order_status in quotes
+            ],
+        )
@@ -15,13 +15,22 @@ _DEFAULT_TICKERS = (
 )
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Settings:
+    """Read from the environment once, when `settings` is created at import."""
+
     DATABASE_URL: str = field(
         default_factory=lambda: os.environ.get(
             "DATABASE_URL", "sqlite+aiosqlite:///./market.db"
         )
     )
+    # Connection pool for server databases (ignored for SQLite)
+    DATABASE_POOL_SIZE: int = field(
+        default_factory=lambda: int(os.environ.get("DATABASE_POOL_SIZE", "20"))
+    )
+    DATABASE_MAX_OVERFLOW: int = field(
+        default_factory=lambda: int(os.environ.get("DATABASE_MAX_OVERFLOW", "10"))
+    )
     JWT_SECRET: str = field(
         default_factory=lambda: os.environ.get("JWT_SECRET", secrets.token_hex(32))
     )
@@ -34,6 +43,9 @@ class Settings:
     TICKERS: dict[str, float] = field(
         default_factory=lambda: json.loads(os.environ.get("TICKERS", _DEFAULT_TICKERS))
     )
+    BCRYPT_COST: int = field(
+        default_factory=lambda: int(os.environ.get("BCRYPT_COST", "10"))
+    )
     STARTING_CASH: float = field(
         default_factory=lambda: float(os.environ.get("STARTING_CASH", "10000.0"))
     )
@@ -43,6 +55,11 @@ class Settings:
     RATE_LIMIT_WINDOW: int = field(
         default_factory=lambda: int(os.environ.get("RATE_LIMIT_WINDOW", "60"))
     )
+    PERSIST_MM_ORDERS: bool = field(
+        default_factory=lambda: (
+            os.environ.get("PERSIST_MM_ORDERS", "false").lower() in ("1", "true", "yes")
+        )
+    )
     HOST: str = field(default_factory=lambda: os.environ.get("HOST", "0.0.0.0"))
     PORT: int = field(default_factory=lambda: int(os.environ.get("PORT", "8000")))
 
@@ -3,7 +3,7 @@ import uuid
 from dataclasses import dataclass, field
 
 
-@dataclass(order=True)
+@dataclass(order=True, slots=True)
 class Order:
     """
     Represents a single order in the order book.
@@ -17,6 +17,15 @@ class Order:
     # Other fields
     quantity: int = field(compare=False)
     user_id: uuid.UUID = field(compare=False)
-    timestamp: float = field(default_factory=time.time, compare=True)
+    # Monotonic ns: an exact int tie-breaker, immune to wall-clock steps
+    timestamp: int = field(default_factory=time.monotonic_ns, compare=True)
     order_id: uuid.UUID = field(default_factory=uuid.uuid4, compare=False)
     time_in_force: str = field(default="GTC", compare=False)
+
+    # String forms of the IDs, formatted once for the API and DB layers
+    user_id_str: str = field(init=False, repr=False, compare=False)
+    order_id_str: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.user_id_str = str(self.user_id)
+        self.order_id_str = str(self.order_id)
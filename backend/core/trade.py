@@ -2,8 +2,10 @@ import time
 import uuid
 from dataclasses import dataclass, field
 
+from core.order import Order
 
-@dataclass
+
+@dataclass(slots=True)
 class Trade:
     """Represents a single completed trade."""
 
@@ -16,3 +18,46 @@ class Trade:
     sell_order_id: uuid.UUID = field(default_factory=uuid.uuid4)
     trade_id: uuid.UUID = field(default_factory=uuid.uuid4)
     timestamp: float = field(default_factory=time.time)
+
+    # String forms of the IDs, formatted once for the API and DB layers.
+    # The matching engine passes in the ones its orders already carry.
+    trade_id_str: str = field(init=False, repr=False)
+    buyer_id_str: str = field(default="", repr=False, kw_only=True)
+    seller_id_str: str = field(default="", repr=False, kw_only=True)
+    buy_order_id_str: str = field(default="", repr=False, kw_only=True)
+    sell_order_id_str: str = field(default="", repr=False, kw_only=True)
+
+    def __post_init__(self):
+        self.trade_id_str = str(self.trade_id)
+        if not self.buyer_id_str:
+            self.buyer_id_str = str(self.buyer_id)
+        if not self.seller_id_str:
+            self.seller_id_str = str(self.seller_id)
+        if not self.buy_order_id_str:
+            self.buy_order_id_str = str(self.buy_order_id)
+        if not self.sell_order_id_str:
+            self.sell_order_id_str = str(self.sell_order_id)
+
+    @classmethod
+    def between(
+        cls,
+        ticker: str,
+        price: float,
+        quantity: int,
+        buy_order: Order,
+        sell_order: Order,
+    ) -> "Trade":
+        """Trade between two orders, reusing their formatted IDs."""
+        return cls(
+            ticker=ticker,
+            price=price,
+            quantity=quantity,
+            buyer_id=buy_order.user_id,
+            seller_id=sell_order.user_id,
+            buy_order_id=buy_order.order_id,
+            sell_order_id=sell_order.order_id,
+            buyer_id_str=buy_order.user_id_str,
+            seller_id_str=sell_order.user_id_str,
+            buy_order_id_str=buy_order.order_id_str,
+            sell_order_id_str=sell_order.order_id_str,
+        )
@@ -1,21 +1,31 @@
 import uuid
-from collections import defaultdict
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """Represents a user or agent in the market."""
 
     user_id: uuid.UUID = field(default_factory=uuid.uuid4)
     username: str = ""
     cash: float = 10000.00
-    portfolio: defaultdict[str, int] = field(default_factory=lambda: defaultdict(int))
+    # ticker -> shares held; tickers at zero are removed, not kept as 0
+    portfolio: dict[str, int] = field(default_factory=dict)
     is_market_maker: bool = False
+    # Cash locked in resting buy orders, maintained by the Exchange
+    escrowed_cash: float = 0.0
+    # String form of user_id, formatted once for the API and DB layers
+    user_id_str: str = field(init=False, repr=False, compare=False)
+    # Set by the Exchange when cash or portfolio changes, cleared by
+    # sync_users_to_db — lets the shutdown sync skip untouched users
+    dirty: bool = field(default=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.user_id_str = str(self.user_id)
 
     def __repr__(self):
         portfolio_str = ", ".join(
-            f"{ticker}: {qty}" for ticker, qty in self.portfolio.items() if qty > 0
+            f"{ticker}: {qty}" for ticker, qty in self.portfolio.items()
         )
         return (
             f"User(ID={str(self.user_id)[-4:]}, "
@@ -1,10 +1,27 @@
 import uuid
-from collections import defaultdict
+from datetime import datetime, timezone
 
+from core.trade import Trade
 from core.user import User
 from db.models import OrderModel, PortfolioHolding, TradeModel, UserModel
-from sqlalchemy import select, update
+from sqlalchemy import (
+    Integer,
+    bindparam,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    select,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+# Dialects whose INSERT supports ON CONFLICT ... DO UPDATE
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
 
 
 async def create_user(
@@ -47,20 +64,6 @@ async def get_user_by_id(session: AsyncSession, user_id: str) -> UserModel | Non
     return result.scalar_one_or_none()
 
 
-async def update_user_cash(session: AsyncSession, user_id: str, cash: float) -> None:
-    await session.execute(
-        update(UserModel).where(UserModel.id == user_id).values(cash=cash)
-    )
-    await session.flush()
-
-
-async def get_holdings(session: AsyncSession, user_id: str) -> list[PortfolioHolding]:
-    result = await session.execute(
-        select(PortfolioHolding).where(PortfolioHolding.user_id == user_id)
-    )
-    return list(result.scalars().all())
-
-
 async def update_holding(
     session: AsyncSession, user_id: str, ticker: str, quantity: int
 ) -> None:
@@ -79,6 +82,31 @@ async def update_holding(
     await session.flush()
 
 
+async def upsert_holdings(session: AsyncSession, users: list[User]) -> None:
+    """Write every holding of `users` with one executemany INSERT ... ON
+    CONFLICT DO UPDATE."""
+    rows = [
+        {"user_id": u.user_id_str, "ticker": ticker, "quantity": qty}
+        for u in users
+        for ticker, qty in u.portfolio.items()
+    ]
+    if not rows:
+        return
+    make_insert = _UPSERT_INSERTS.get(session.get_bind().dialect.name)
+    if make_insert is None:
+        for row in rows:
+            await update_holding(session, **row)
+        return
+    # Rows go as executemany parameters, not one .values(rows) statement: the
+    # driver pages them, so a large shutdown sync stays under the bind limit
+    stmt = make_insert(PortfolioHolding)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "ticker"],
+        set_={"quantity": stmt.excluded.quantity},
+    )
+    await session.execute(stmt, rows)
+
+
 async def record_order(
     session: AsyncSession,
     order_id: str,
@@ -90,47 +118,56 @@ async def record_order(
     filled_quantity: int,
     status: str,
     time_in_force: str = "GTC",
-) -> OrderModel:
-    db_order = OrderModel(
-        id=order_id,
-        user_id=user_id,
-        ticker=ticker,
-        side=side,
-        price=price,
-        quantity=quantity,
-        filled_quantity=filled_quantity,
-        status=status,
-        time_in_force=time_in_force,
-    )
-    session.add(db_order)
-    await session.flush()
-    return db_order
-
-
-async def record_trade(
-    session: AsyncSession,
-    trade_id: str,
-    ticker: str,
-    price: float,
-    quantity: int,
-    buyer_id: str,
-    seller_id: str,
-    buy_order_id: str,
-    sell_order_id: str,
-) -> TradeModel:
-    db_trade = TradeModel(
-        id=trade_id,
-        ticker=ticker,
-        price=price,
-        quantity=quantity,
-        buyer_id=buyer_id,
-        seller_id=seller_id,
-        buy_order_id=buy_order_id,
-        sell_order_id=sell_order_id,
+    created_at: datetime | None = None,
+) -> None:
+    """Insert an order row with a Core INSERT — the caller already knows its id
+    and nothing reads the row back, so no ORM object or flush is needed.
+    Pass `created_at` when the row is written after the order was placed."""
+    row = {
+        "id": order_id,
+        "user_id": user_id,
+        "ticker": ticker,
+        "side": side,
+        "price": price,
+        "quantity": quantity,
+        "filled_quantity": filled_quantity,
+        "status": status,
+        "time_in_force": time_in_force,
+    }
+    if created_at is not None:
+        row["created_at"] = created_at
+    await record_orders(session, [row])
+
+
+async def record_orders(session: AsyncSession, rows: list[dict]) -> None:
+    """Insert several order rows (OrderModel column dicts) in one executemany."""
+    if not rows:
+        return
+    await session.execute(insert(OrderModel), rows)
+
+
+async def record_trades(session: AsyncSession, trades: list[Trade]) -> None:
+    """Insert all trades from one match in a single executemany round-trip.
+    Rows are stamped with the match time, not the (possibly queued) write."""
+    if not trades:
+        return
+    await session.execute(
+        insert(TradeModel),
+        [
+            {
+                "id": t.trade_id_str,
+                "ticker": t.ticker,
+                "price": t.price,
+                "quantity": t.quantity,
+                "buyer_id": t.buyer_id_str,
+                "seller_id": t.seller_id_str,
+                "buy_order_id": t.buy_order_id_str,
+                "sell_order_id": t.sell_order_id_str,
+                "created_at": datetime.fromtimestamp(t.timestamp, timezone.utc),
+            }
+            for t in trades
+        ],
     )
-    session.add(db_trade)
-    await session.flush()
-    return db_trade
 
 
 async def get_user_trades(
@@ -139,6 +176,7 @@ async def get_user_trades(
     ticker: str | None = None,
     limit: int = 50,
     offset: int = 0,
+    before: tuple[datetime, str] | None = None,
 ) -> list[TradeModel]:
     from sqlalchemy import or_
 
@@ -147,38 +185,88 @@ async def get_user_trades(
     )
     if ticker is not None:
         stmt = stmt.where(TradeModel.ticker == ticker)
-    stmt = stmt.order_by(TradeModel.created_at.desc()).limit(limit).offset(offset)
+    if before is not None:
+        stmt = stmt.where(tuple_(TradeModel.created_at, TradeModel.id) < before)
+    stmt = (
+        stmt.order_by(TradeModel.created_at.desc(), TradeModel.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
     result = await session.execute(stmt)
     return list(result.scalars().all())
 
 
-async def get_trades_for_ticker(
+async def get_candles_for_ticker(
     session: AsyncSession,
     ticker: str,
+    interval_seconds: int,
     start=None,
     end=None,
-) -> list[TradeModel]:
-    stmt = select(TradeModel).where(TradeModel.ticker == ticker)
+) -> list[tuple[int, float, float, float, float, int]]:
+    """OHLCV candles aggregated in the database.
+
+    Returns (bucket_start_epoch_seconds, open, high, low, close, volume) rows in
+    time order, so only one row per candle crosses the wire.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        epoch = cast(func.strftime("%s", TradeModel.created_at), Integer)
+    else:
+        # extract() yields fractional seconds and a cast rounds, which could
+        # push a trade into the next bucket; floor to truncate like strftime
+        epoch = cast(func.floor(func.extract("epoch", TradeModel.created_at)), Integer)
+    bucket = epoch // interval_seconds
+
+    # One window sort per bucket yields both open (first) and close (last)
+    window = {
+        "partition_by": bucket,
+        # id breaks created_at ties, so trades written together still give
+        # the same open and close on every query
+        "order_by": (TradeModel.created_at.asc(), TradeModel.id.asc()),
+        "rows": (None, None),
+    }
+    ranked = select(
+        bucket.label("bucket"),
+        TradeModel.price,
+        TradeModel.quantity,
+        func.first_value(TradeModel.price).over(**window).label("open"),
+        func.last_value(TradeModel.price).over(**window).label("close"),
+    ).where(TradeModel.ticker == ticker)
     if start is not None:
-        stmt = stmt.where(TradeModel.created_at >= start)
+        ranked = ranked.where(TradeModel.created_at >= start)
     if end is not None:
-        stmt = stmt.where(TradeModel.created_at <= end)
-    stmt = stmt.order_by(TradeModel.created_at.asc())
+        ranked = ranked.where(TradeModel.created_at <= end)
+    ranked = ranked.subquery()
+
+    stmt = (
+        select(
+            ranked.c.bucket * interval_seconds,
+            func.max(ranked.c.open),
+            func.max(ranked.c.price),
+            func.min(ranked.c.price),
+            func.max(ranked.c.close),
+            func.sum(ranked.c.quantity),
+        )
+        .group_by(ranked.c.bucket)
+        .order_by(ranked.c.bucket)
+    )
     result = await session.execute(stmt)
-    return list(result.scalars().all())
+    return result.all()
 
 
-async def get_leaderboard(session: AsyncSession, limit: int = 50) -> list[dict]:
-    from sqlalchemy.orm import selectinload
+# Eager-load only non-empty holdings; sold-out rows are filtered in SQL.
+# selectinload never duplicates parent rows, so no .unique() is needed.
+_HELD_HOLDINGS = selectinload(UserModel.holdings.and_(PortfolioHolding.quantity > 0))
 
+
+async def get_leaderboard(session: AsyncSession, limit: int = 50) -> list[dict]:
     result = await session.execute(
         select(UserModel)
         .where(UserModel.is_market_maker.is_(False))
-        .options(selectinload(UserModel.holdings))
+        .options(_HELD_HOLDINGS)
         .order_by(UserModel.cash.desc())
         .limit(limit)
     )
-    users = result.scalars().unique().all()
+    users = result.scalars().all()
     leaderboard = []
     for user in users:
         leaderboard.append(
@@ -187,9 +275,7 @@ async def get_leaderboard(session: AsyncSession, limit: int = 50) -> list[dict]:
                 "username": user.username,
                 "cash": user.cash,
                 "holdings": [
-                    {"ticker": h.ticker, "quantity": h.quantity}
-                    for h in user.holdings
-                    if h.quantity > 0
+                    {"ticker": h.ticker, "quantity": h.quantity} for h in user.holdings
                 ],
             }
         )
@@ -198,14 +284,12 @@ async def get_leaderboard(session: AsyncSession, limit: int = 50) -> list[dict]:
 
 async def load_all_users(session: AsyncSession) -> list[User]:
     """Load all users from DB into in-memory User objects."""
-    result = await session.execute(select(UserModel))
+    # Holdings come in one extra IN query rather than one query per user
+    result = await session.execute(select(UserModel).options(_HELD_HOLDINGS))
     db_users = result.scalars().all()
     users = []
     for db_user in db_users:
-        holdings = await get_holdings(session, db_user.id)
-        portfolio = defaultdict(int)
-        for h in holdings:
-            portfolio[h.ticker] = h.quantity
+        portfolio = {h.ticker: h.quantity for h in db_user.holdings}
         user = User(
             user_id=uuid.UUID(db_user.id),
             username=db_user.username,
@@ -222,17 +306,25 @@ async def get_open_orders(
     user_id: str,
     limit: int = 50,
     offset: int = 0,
+    before: tuple[datetime, str] | None = None,
 ) -> list[OrderModel]:
-    result = await session.execute(
-        select(OrderModel)
-        .where(
-            OrderModel.user_id == user_id,
-            OrderModel.status.in_(["open", "partial"]),
-        )
-        .order_by(OrderModel.created_at.desc())
+    """
+    Newest-first open orders. Pass the last row's (created_at, id) as `before`
+    to page by keyset instead of OFFSET, which has to scan every skipped row;
+    the id breaks ties between rows written in the same instant.
+    """
+    stmt = select(OrderModel).where(
+        OrderModel.user_id == user_id,
+        OrderModel.status.in_(["open", "partial"]),
+    )
+    if before is not None:
+        stmt = stmt.where(tuple_(OrderModel.created_at, OrderModel.id) < before)
+    stmt = (
+        stmt.order_by(OrderModel.created_at.desc(), OrderModel.id.desc())
         .limit(limit)
         .offset(offset)
     )
+    result = await session.execute(stmt)
     return list(result.scalars().all())
 
 
@@ -241,26 +333,90 @@ async def get_order_by_id(session: AsyncSession, order_id: str) -> OrderModel |
     return result.scalar_one_or_none()
 
 
-async def update_order_fill(
-    session: AsyncSession, order_id: str, filled_quantity: int, status: str
-) -> None:
+async def apply_order_fills(session: AsyncSession, fills: dict[str, int]) -> None:
+    """Add fill quantities to resting orders in one executemany UPDATE.
+
+    `fills` maps order id -> additional filled quantity. The new total and
+    status are computed by the database, so no rows are read back first.
+    """
+    if not fills:
+        return
+    orders = OrderModel.__table__
+    new_filled = orders.c.filled_quantity + bindparam("fill")
+    stmt = (
+        update(orders)
+        .where(orders.c.id == bindparam("order_id"))
+        .values(
+            filled_quantity=new_filled,
+            status=case((new_filled >= orders.c.quantity, "filled"), else_="partial"),
+        )
+    )
     await session.execute(
-        update(OrderModel)
-        .where(OrderModel.id == order_id)
-        .values(filled_quantity=filled_quantity, status=status)
+        stmt, [{"order_id": oid, "fill": qty} for oid, qty in fills.items()]
     )
-    await session.flush()
 
 
 async def cancel_order_db(session: AsyncSession, order_id: str) -> None:
     await session.execute(
         update(OrderModel).where(OrderModel.id == order_id).values(status="cancelled")
     )
-    await session.flush()
+
+
+async def cancel_orders_db(session: AsyncSession, order_ids: list[str]) -> None:
+    """Mark several orders cancelled with a single UPDATE ... WHERE id IN."""
+    if not order_ids:
+        return
+    await session.execute(
+        update(OrderModel)
+        .where(OrderModel.id.in_(order_ids))
+        .values(status="cancelled")
+    )
 
 
 async def sync_user_to_db(session: AsyncSession, user: User) -> None:
     """Sync in-memory user state back to DB."""
-    await update_user_cash(session, str(user.user_id), user.cash)
-    for ticker, qty in user.portfolio.items():
-        await update_holding(session, str(user.user_id), ticker, qty)
+    await sync_users_to_db(session, [user])
+
+
+_SYNCED_USERS = "synced_users"
+
+# Users per sold-out DELETE; each binds its id plus one pair per holding
+_DELETE_CHUNK = 500
+
+
+def restore_dirty_flags(session: AsyncSession) -> None:
+    """Mark users synced in `session` dirty again after its transaction
+    failed, so a later sync (at the latest, at shutdown) still writes them."""
+    for user in session.info.pop(_SYNCED_USERS, ()):
+        user.dirty = True
+
+
+async def sync_users_to_db(session: AsyncSession, users: list[User]) -> None:
+    """Sync several users at once, with one executemany UPDATE for cash."""
+    if not users:
+        return
+    # Cleared before reading state: a change made while the writes below are
+    # awaited sets the flag again. If the transaction fails instead, the
+    # caller hands the session to restore_dirty_flags.
+    for user in users:
+        user.dirty = False
+    session.info.setdefault(_SYNCED_USERS, []).extend(users)
+    user_table = UserModel.__table__
+    await session.execute(
+        update(user_table)
+        .where(user_table.c.id == bindparam("user_id"))
+        .values(cash=bindparam("cash")),
+        [{"user_id": u.user_id_str, "cash": u.cash} for u in users],
+    )
+    await upsert_holdings(session, users)
+    # Sold-out tickers are dropped from the in-memory portfolio, so delete the
+    # users' rows for any ticker they no longer hold. Chunked to keep the
+    # bound (user_id, ticker) pairs under the drivers' parameter limits.
+    for i in range(0, len(users), _DELETE_CHUNK):
+        chunk = users[i : i + _DELETE_CHUNK]
+        where = [PortfolioHolding.user_id.in_([u.user_id_str for u in chunk])]
+        live = [(u.user_id_str, ticker) for u in chunk for ticker in u.portfolio]
+        if live:
+            held = tuple_(PortfolioHolding.user_id, PortfolioHolding.ticker)
+            where.append(held.not_in(live))
+        await session.execute(delete(PortfolioHolding).where(*where))
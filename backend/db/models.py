@@ -6,6 +6,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
@@ -58,9 +59,7 @@ class OrderModel(Base):
     __tablename__ = "orders"
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=_uuid)
-    user_id: Mapped[str] = mapped_column(
-        String, ForeignKey("users.id"), nullable=False, index=True
-    )
+    user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), nullable=False)
     ticker: Mapped[str] = mapped_column(String, nullable=False, index=True)
     side: Mapped[str] = mapped_column(String, nullable=False)
     price: Mapped[float] = mapped_column(Float, nullable=False)
@@ -70,20 +69,34 @@ class OrderModel(Base):
     time_in_force: Mapped[str] = mapped_column(String, default="GTC")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=_utcnow)
 
+    # A user's open orders (GET /api/orders): seeks straight to the open and
+    # partial rows instead of walking every order the user ever placed
+    __table_args__ = (
+        Index("ix_orders_user_status_created", "user_id", "status", "created_at"),
+    )
+
 
 class TradeModel(Base):
     __tablename__ = "trades"
 
     id: Mapped[str] = mapped_column(String, primary_key=True, default=_uuid)
-    ticker: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    ticker: Mapped[str] = mapped_column(String, nullable=False)
     price: Mapped[float] = mapped_column(Float, nullable=False)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False)
     buyer_id: Mapped[str] = mapped_column(
-        String, ForeignKey("users.id"), nullable=False, index=True
+        String, ForeignKey("users.id"), nullable=False
     )
     seller_id: Mapped[str] = mapped_column(
-        String, ForeignKey("users.id"), nullable=False, index=True
+        String, ForeignKey("users.id"), nullable=False
     )
     buy_order_id: Mapped[str] = mapped_column(String, nullable=False)
     sell_order_id: Mapped[str] = mapped_column(String, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=_utcnow)
+
+    # One index per side of the buyer OR seller lookup (GET /api/trades), each
+    # already in created_at order; candles read a ticker's trades by time range
+    __table_args__ = (
+        Index("ix_trades_ticker_created", "ticker", "created_at"),
+        Index("ix_trades_buyer_created", "buyer_id", "created_at"),
+        Index("ix_trades_seller_created", "seller_id", "created_at"),
+    )
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+
+from db.crud import restore_dirty_flags
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger("market-sim.db")
+
+WriteJob = Callable[[AsyncSession], Awaitable[None]]
+
+
+class DBWriter:
+    """
+    Write-behind queue that takes DB persistence off the order hot path.
+    Jobs are async callables that receive a session and only flush; a single
+    worker runs them in FIFO order, committing everything queued so far in
+    one transaction. Readers that need their own writes call `drain()` first.
+
+    A write that fails is never dropped: it and every job queued behind it
+    are parked and retried with exponential backoff, so a DB outage delays
+    writes but still lands them in submission order.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        max_batch: int = 500,
+        retry_delay: float = 0.1,
+        max_retry_delay: float = 30.0,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._queue: asyncio.Queue[WriteJob] = asyncio.Queue()
+        # Failed jobs and the jobs queued behind them, oldest first
+        self._parked: list[WriteJob] = []
+        # Jobs run in FIFO order, so "job N is done" means all before it are
+        self._submitted = 0
+        self._done = 0
+        self._progress = asyncio.Condition()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> asyncio.Task:
+        """Start the worker; cancel the returned task to stop it."""
+        self._task = asyncio.create_task(self.run())
+        return self._task
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def parked(self) -> int:
+        """Number of writes waiting on a retry."""
+        return len(self._parked)
+
+    def submit(self, job: WriteJob) -> None:
+        self._submitted += 1
+        self._queue.put_nowait(job)
+
+    async def drain(self) -> None:
+        """Wait until every job submitted so far has been committed or parked
+        for retry. Jobs submitted while waiting don't extend the wait.
+        Raises RuntimeError if the worker isn't running or dies meanwhile."""
+        target = self._submitted
+        if self._done >= target:
+            return
+        if not self.running:
+            raise RuntimeError("DB writer is not running")
+        waiter = asyncio.ensure_future(self._wait_done(target))
+        try:
+            await asyncio.wait(
+                (waiter, self._task), return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            waiter.cancel()
+        if not waiter.done() or waiter.cancelled():
+            raise RuntimeError(
+                f"DB writer stopped with {target - self._done} writes pending"
+            )
+
+    async def _wait_done(self, target: int) -> None:
+        async with self._progress:
+            await self._progress.wait_for(lambda: self._done >= target)
+
+    async def run(self):
+        delay = self.retry_delay
+        while True:
+            if self._parked:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                fresh = []
+            else:
+                delay = self.retry_delay
+                fresh = [await self._queue.get()]
+            room = self.max_batch - len(self._parked)
+            while len(fresh) < room and not self._queue.empty():
+                fresh.append(self._queue.get_nowait())
+            # Counted only once written or parked: if the worker dies here,
+            # drain() must not report these jobs as settled
+            self._parked = await self._write(self._parked + fresh)
+            async with self._progress:
+                self._done += len(fresh)
+                self._progress.notify_all()
+
+    async def _write(self, batch: list[WriteJob]) -> list[WriteJob]:
+        """Commit `batch`, returning the jobs still to be written: the first
+        one that failed on its own and everything after it."""
+        try:
+            await self._commit(batch)
+            return []
+        except Exception:
+            if len(batch) == 1:
+                logger.exception("DB write failed, retrying")
+                return batch
+            # Isolate the failing job so the ones before it still land
+            logger.exception("Batch of %d writes failed, retrying", len(batch))
+        for i, job in enumerate(batch):
+            try:
+                await self._commit([job])
+            except Exception:
+                logger.exception("DB write failed, parking %d writes", len(batch) - i)
+                return batch[i:]
+        return []
+
+    async def _commit(self, jobs: list[WriteJob]) -> None:
+        async with self.session_factory() as session:
+            try:
+                for job in jobs:
+                    await job(session)
+                await session.commit()
+            except Exception:
+                restore_dirty_flags(session)
+                raise
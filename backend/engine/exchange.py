@@ -18,19 +18,28 @@ class Exchange:
 
     def __init__(self):
         self.order_books: dict[str, OrderBook] = {}
+        # Listed tickers, rebuilt only when a ticker is added
+        self.tickers: tuple[str, ...] = ()
         self.matching_engines: dict[str, MatchingEngine] = {}
         self.last_trades: dict[str, float] = {}
         self.users: dict[UUID, User] = {}
         self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
         self.on_trades: Callable[[str, list[Trade]], None] | None = None
+        # Bumped on every book or price change so readers can cache snapshots
+        self.version = 0
+        # (version, snapshot) of the last quote_snapshot()/get_exchange_stats()
+        self._quotes_cache: tuple[int, dict] = (-1, {})
+        self._stats_cache: tuple[int, dict] = (-1, {})
 
     def add_ticker(self, ticker: str, initial_price: float | None = None):
         if ticker not in self.order_books:
             order_book = OrderBook(ticker)
             self.order_books[ticker] = order_book
             self.matching_engines[ticker] = MatchingEngine(order_book)
+            self.tickers = (*self.tickers, ticker)
             if initial_price is not None:
                 self.last_trades[ticker] = initial_price
+            self.version += 1
 
     def register_user(self, user: User):
         self.users[user.user_id] = user
@@ -61,18 +70,17 @@ class Exchange:
             # FOK pre-check: verify enough liquidity exists before escrowing
             if tif == "FOK":
                 available = 0
+                book = self.order_books[ticker]
                 if side == "buy":
-                    for ask in self.order_books[ticker].asks:
-                        if ask.price <= order.price:
-                            available += ask.quantity
-                        else:
+                    for price, quantity in book.price_levels("sell"):
+                        if price > order.price:
                             break
+                        available += quantity
                 elif side == "sell":
-                    for bid in self.order_books[ticker].bids:
-                        if bid.price >= order.price:
-                            available += bid.quantity
-                        else:
+                    for price, quantity in book.price_levels("buy"):
+                        if price < order.price:
                             break
+                        available += quantity
                 if available < order.quantity:
                     raise ValueError("FOK order cannot be fully filled")
 
@@ -87,16 +95,25 @@ class Exchange:
                         )
                     user.cash -= cost
                 elif side == "sell":
-                    if user.portfolio[ticker] < order.quantity:
+                    held = user.portfolio.get(ticker, 0)
+                    if held < order.quantity:
                         raise ValueError(
                             f"Insufficient shares: need {order.quantity} "
-                            f"{ticker}, have {user.portfolio[ticker]}"
+                            f"{ticker}, have {held}"
                         )
-                    user.portfolio[ticker] -= order.quantity
+                    if held == order.quantity:
+                        del user.portfolio[ticker]
+                    else:
+                        user.portfolio[ticker] = held - order.quantity
+
+            user.dirty = True
 
             # Match — only add remainder to book for GTC orders
             add_to_book = tif == "GTC"
-            trades = engine.process_order(order, side, add_to_book=add_to_book)
+            trades, notional, filled_qty = engine.process_order(
+                order, side, add_to_book=add_to_book
+            )
+            self.version += 1
 
             # Update last trade price
             if trades:
@@ -111,32 +128,45 @@ class Exchange:
                 buyer = self.users.get(trade.buyer_id)
                 seller = self.users.get(trade.seller_id)
                 if buyer:
-                    buyer.portfolio[ticker] += trade.quantity
+                    buyer.dirty = True
+                    portfolio = buyer.portfolio
+                    portfolio[ticker] = portfolio.get(ticker, 0) + trade.quantity
+                    # A resting bid was filled — release that part of its escrow
+                    if side == "sell" and not buyer.is_market_maker:
+                        buyer.escrowed_cash -= trade.price * trade.quantity
                 if seller:
+                    seller.dirty = True
                     seller.cash += trade.price * trade.quantity
 
             # Refund un-filled portion of escrow
             remaining_qty = order.quantity  # after matching, this is unfilled qty
-            filled_qty = original_qty - remaining_qty
 
             if not user.is_market_maker and side == "buy" and filled_qty > 0:
                 # Refund price improvement on the filled portion.
                 # Unfilled escrow (remaining_qty * price) stays deducted
                 # since those shares are still resting on the book.
-                total_escrowed_for_filled = order.price * filled_qty
-                total_cost = sum(
-                    t.price * t.quantity for t in trades if t.buyer_id == order.user_id
-                )
-                refund = total_escrowed_for_filled - total_cost
+                # The incoming buy is the buyer in every trade, so the
+                # notional is exactly what it paid
+                refund = order.price * filled_qty - notional
                 if refund > 0:
                     user.cash += refund
 
+            # Unfilled GTC buy remainder now rests on the book holding escrow
+            if (
+                tif == "GTC"
+                and side == "buy"
+                and remaining_qty > 0
+                and not user.is_market_maker
+            ):
+                user.escrowed_cash += order.price * remaining_qty
+
             # IOC: refund unfilled escrow since remainder is NOT on the book
             if tif == "IOC" and remaining_qty > 0 and not user.is_market_maker:
                 if side == "buy":
                     user.cash += order.price * remaining_qty
                 elif side == "sell":
-                    user.portfolio[ticker] += remaining_qty
+                    portfolio = user.portfolio
+                    portfolio[ticker] = portfolio.get(ticker, 0) + remaining_qty
 
             # Determine status
             if tif == "GTC":
@@ -178,15 +208,19 @@ class Exchange:
             removed = order_book.remove_order(order_id, side)
             if removed is None:
                 raise ValueError("Order not found on book.")
+            self.version += 1
 
             remaining_qty = removed.quantity
 
             # Refund escrowed amount (skip for market makers, matching place_order)
             if not user.is_market_maker:
+                user.dirty = True
                 if side == "buy":
                     user.cash += removed.price * remaining_qty
+                    user.escrowed_cash -= removed.price * remaining_qty
                 elif side == "sell":
-                    user.portfolio[ticker] += remaining_qty
+                    portfolio = user.portfolio
+                    portfolio[ticker] = portfolio.get(ticker, 0) + remaining_qty
 
             return remaining_qty
 
@@ -206,16 +240,30 @@ class Exchange:
         async with self._locks[ticker]:
             order_book = self.order_books[ticker]
             removed = order_book.remove_orders_by_user(user_id)
+            if removed:
+                self.version += 1
 
-            if not user.is_market_maker:
+            if not user.is_market_maker and removed:
+                user.dirty = True
                 for order, side in removed:
                     if side == "buy":
                         user.cash += order.price * order.quantity
+                        user.escrowed_cash -= order.price * order.quantity
                     elif side == "sell":
-                        user.portfolio[ticker] += order.quantity
+                        portfolio = user.portfolio
+                        portfolio[ticker] = portfolio.get(ticker, 0) + order.quantity
 
             return removed
 
+    def find_order(self, order_id: str) -> tuple[str, Order, str] | None:
+        """(ticker, order, side) of a resting order, or None if it isn't on
+        any book. One dict lookup per listed ticker."""
+        for ticker, book in self.order_books.items():
+            entry = book.get_order(order_id)
+            if entry is not None:
+                return ticker, *entry
+        return None
+
     def get_order_book(self, ticker: str) -> OrderBook:
         if ticker not in self.order_books:
             raise ValueError(f"Ticker '{ticker}' is not listed on this exchange.")
@@ -227,19 +275,60 @@ class Exchange:
 
         if ticker in self.order_books:
             order_book = self.order_books[ticker]
-            if order_book.bids and order_book.asks:
-                return (order_book.bids[0].price + order_book.asks[0].price) / 2.0
+            best_bid = order_book.best_price("buy")
+            best_ask = order_book.best_price("sell")
+            if best_bid is not None and best_ask is not None:
+                return (best_bid + best_ask) / 2.0
 
         return None
 
+    def price_snapshot(self) -> dict[str, float]:
+        """Current price per ticker, for valuing many holdings at once.
+        Tickers with no price yet are omitted. The result may be the live
+        `last_trades` dict — treat it as read-only."""
+        if len(self.last_trades) == len(self.order_books):
+            return self.last_trades
+        prices = {}
+        for ticker in self.order_books:
+            price = self.get_current_price(ticker)
+            if price is not None:
+                prices[ticker] = price
+        return prices
+
+    def quote_snapshot(self) -> dict[str, dict]:
+        """Current price, best bid and best ask per ticker. Rebuilt only after
+        the exchange changes; the result is shared — treat it as read-only."""
+        version, quotes = self._quotes_cache
+        if version == self.version:
+            return quotes
+        quotes = {}
+        last_trades = self.last_trades
+        for ticker, book in self.order_books.items():
+            # Inlined get_current_price, reusing the book's best prices
+            best_bid = book.best_price("buy")
+            best_ask = book.best_price("sell")
+            price = last_trades.get(ticker)
+            if price is None and best_bid is not None and best_ask is not None:
+                price = (best_bid + best_ask) / 2.0
+            quotes[ticker] = {
+                "current_price": price,
+                "best_bid": best_bid,
+                "best_ask": best_ask,
+            }
+        self._quotes_cache = (self.version, quotes)
+        return quotes
+
     def get_exchange_stats(self) -> dict:
+        version, stats = self._stats_cache
+        if version == self.version:
+            return stats
         stats = {}
-        for ticker, book in self.order_books.items():
+        for ticker, quote in self.quote_snapshot().items():
+            book = self.order_books[ticker]
             stats[ticker] = {
-                "current_price": self.get_current_price(ticker),
-                "best_bid": book.bids[0].price if book.bids else None,
-                "best_ask": book.asks[0].price if book.asks else None,
-                "total_bids": len(book.bids),
-                "total_asks": len(book.asks),
+                **quote,
+                "total_bids": book.order_count("buy"),
+                "total_asks": book.order_count("sell"),
             }
+        self._stats_cache = (self.version, stats)
         return stats
@@ -1,8 +1,16 @@
+from typing import NamedTuple
+
 from core.order import Order
 from core.trade import Trade
 from engine.orderbook import OrderBook
 
 
+class MatchResult(NamedTuple):
+    trades: list[Trade]
+    notional: float  # sum of price * quantity over the trades
+    filled: int  # total quantity traded
+
+
 class MatchingEngine:
     """
     Processes incoming orders against the order book and generates trades.
@@ -13,76 +21,61 @@ class MatchingEngine:
 
     def process_order(
         self, incoming_order: Order, side: str, add_to_book: bool = True
-    ) -> list[Trade]:
+    ) -> MatchResult:
         """
-        Processes a new order and returns a list of trades that occurred.
+        Processes a new order and returns the trades that occurred, with
+        their total notional and quantity accumulated along the way.
         When add_to_book=False, unfilled remainder is NOT added to the book
         (used for IOC/FOK orders).
         """
 
         trades_made = []
+        notional = 0.0
+        filled = 0
         ticker = self.order_book.ticker
 
         if side == "buy":
-            while (
-                incoming_order.quantity > 0
-                and self.order_book.asks
-                and incoming_order.price >= self.order_book.asks[0].price
-            ):
-                book_order = self.order_book.asks[0]
+            while incoming_order.quantity > 0:
+                book_order = self.order_book.best_order("sell")
+                if book_order is None or incoming_order.price < book_order.price:
+                    break
 
                 trade_quantity = min(incoming_order.quantity, book_order.quantity)
                 trade_price = book_order.price
 
-                trade = Trade(
-                    ticker=ticker,
-                    price=trade_price,
-                    quantity=trade_quantity,
-                    buyer_id=incoming_order.user_id,
-                    seller_id=book_order.user_id,
-                    buy_order_id=incoming_order.order_id,
-                    sell_order_id=book_order.order_id,
+                trade = Trade.between(
+                    ticker, trade_price, trade_quantity, incoming_order, book_order
                 )
                 trades_made.append(trade)
+                notional += trade_price * trade_quantity
+                filled += trade_quantity
 
                 incoming_order.quantity -= trade_quantity
-                book_order.quantity -= trade_quantity
-
-                if book_order.quantity == 0:
-                    self.order_book.asks.pop(0)
+                self.order_book.fill_top("sell", trade_quantity)
 
             if incoming_order.quantity > 0 and add_to_book:
                 self.order_book.add_order(incoming_order, "buy")
 
         elif side == "sell":
-            while (
-                incoming_order.quantity > 0
-                and self.order_book.bids
-                and incoming_order.price <= self.order_book.bids[0].price
-            ):
-                book_order = self.order_book.bids[0]
+            while incoming_order.quantity > 0:
+                book_order = self.order_book.best_order("buy")
+                if book_order is None or incoming_order.price > book_order.price:
+                    break
 
                 trade_quantity = min(incoming_order.quantity, book_order.quantity)
                 trade_price = book_order.price
 
-                trade = Trade(
-                    ticker=ticker,
-                    price=trade_price,
-                    quantity=trade_quantity,
-                    buyer_id=book_order.user_id,
-                    seller_id=incoming_order.user_id,
-                    buy_order_id=book_order.order_id,
-                    sell_order_id=incoming_order.order_id,
+                trade = Trade.between(
+                    ticker, trade_price, trade_quantity, book_order, incoming_order
                 )
                 trades_made.append(trade)
+                notional += trade_price * trade_quantity
+                filled += trade_quantity
 
                 incoming_order.quantity -= trade_quantity
-                book_order.quantity -= trade_quantity
-
-                if book_order.quantity == 0:
-                    self.order_book.bids.pop(0)
+                self.order_book.fill_top("buy", trade_quantity)
 
             if incoming_order.quantity > 0 and add_to_book:
                 self.order_book.add_order(incoming_order, "sell")
 
-        return trades_made
+        return MatchResult(trades_made, notional, filled)
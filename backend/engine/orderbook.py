@@ -1,60 +1,158 @@
+import bisect
 import uuid
+from collections import OrderedDict, defaultdict
+from itertools import islice
 
 from core.order import Order
 
+# price -> resting orders at that price by id, oldest first. The indexes key
+# on the ID strings: str caches its hash, UUID.__hash__ runs Python code.
+_Queues = dict[float, OrderedDict[str, Order]]
+
 
 class OrderBook:
     """
     Manages the collection of buy (bid) and sell (ask) orders for a single stock.
+    Orders rest in per-price FIFO queues; a sorted list of the prices with
+    orders on them gives the best level without rescanning the book. Orders
+    are also indexed by id and by user, so cancels never scan the book.
     """
 
     def __init__(self, ticker: str):
         self.ticker = ticker
-        self.bids: list[Order] = []  # List of buy orders
-        self.asks: list[Order] = []  # List of sell orders
+        self._bid_queues: _Queues = {}
+        self._ask_queues: _Queues = {}
+        # Aggregated resting quantity per price, kept in sync on every
+        # add/fill/remove so depth reads never rescan individual orders
+        self.bid_levels: dict[float, int] = {}
+        self.ask_levels: dict[float, int] = {}
+        self._bid_prices: list[float] = []  # ascending
+        self._ask_prices: list[float] = []  # ascending
+        self._order_counts = {"buy": 0, "sell": 0}
+        # order_id -> (order, side), and user_id -> ids of their resting orders
+        self._orders: dict[str, tuple[Order, str]] = {}
+        self._user_orders: defaultdict[str, set[str]] = defaultdict(set)
 
-    def add_order(self, order: Order, side: str):
-        """Adds an order to the book and keeps it sorted."""
+    def _side(self, side: str) -> tuple[_Queues, dict[float, int], list[float]]:
+        if side == "buy":
+            return self._bid_queues, self.bid_levels, self._bid_prices
+        return self._ask_queues, self.ask_levels, self._ask_prices
+
+    def _reduce_level(self, side: str, price: float, quantity: int):
+        queues, levels, prices = self._side(side)
+        levels[price] -= quantity
+        if levels[price] <= 0:
+            del levels[price]
+            del queues[price]
+            prices.pop(bisect.bisect_left(prices, price))
+
+    def _forget(self, order: Order, side: str):
+        """Drop a departed order from the id/user indexes and the side count."""
+        del self._orders[order.order_id_str]
+        user_orders = self._user_orders[order.user_id_str]
+        user_orders.discard(order.order_id_str)
+        if not user_orders:
+            del self._user_orders[order.user_id_str]
+        self._order_counts[side] -= 1
+
+    def _best_prices(self, side: str):
+        """Prices on `side`, best first."""
+        if side == "buy":
+            return reversed(self._bid_prices)
+        return iter(self._ask_prices)
+
+    def best_price(self, side: str) -> float | None:
+        """Best bid (side="buy") or best ask (side="sell"), or None if empty."""
         if side == "buy":
-            self.bids.append(order)
-            # Sort bids from highest to lowest price (descending).
-            # If prices are equal, the older order (smaller timestamp) comes first.
-            self.bids.sort(key=lambda o: (-o.price, o.timestamp))
-        elif side == "sell":
-            self.asks.append(order)
-            # Sort asks from lowest to highest price (ascending).
-            # If prices are equal, the older order (smaller timestamp) comes first.
-            self.asks.sort(key=lambda o: (o.price, o.timestamp))
+            return self._bid_prices[-1] if self._bid_prices else None
+        return self._ask_prices[0] if self._ask_prices else None
+
+    def best_order(self, side: str) -> Order | None:
+        """The order first in line on `side`: best price, then oldest."""
+        price = self.best_price(side)
+        if price is None:
+            return None
+        queues = self._bid_queues if side == "buy" else self._ask_queues
+        return next(iter(queues[price].values()))
+
+    def order_count(self, side: str) -> int:
+        return self._order_counts[side]
+
+    def orders(self, side: str) -> list[Order]:
+        """All resting orders on `side` in priority order. Walks the whole
+        side — for inspection, not for hot paths."""
+        queues = self._bid_queues if side == "buy" else self._ask_queues
+        return [order for p in self._best_prices(side) for order in queues[p].values()]
+
+    @property
+    def bids(self) -> list[Order]:
+        return self.orders("buy")
+
+    @property
+    def asks(self) -> list[Order]:
+        return self.orders("sell")
+
+    def price_levels(
+        self, side: str, depth: int | None = None
+    ) -> list[tuple[float, int]]:
+        """Aggregated (price, quantity) levels, best price first, optionally
+        only the best `depth` of them."""
+        levels = self.bid_levels if side == "buy" else self.ask_levels
+        return [(p, levels[p]) for p in islice(self._best_prices(side), depth)]
+
+    def fill_top(self, side: str, quantity: int):
+        """Fill `quantity` against the best order on `side`, popping it when done."""
+        queues, _levels, _prices = self._side(side)
+        price = self.best_price(side)
+        queue = queues[price]
+        order = next(iter(queue.values()))
+        order.quantity -= quantity
+        if order.quantity == 0:
+            queue.popitem(last=False)
+            self._forget(order, side)
+        self._reduce_level(side, price, quantity)
+
+    def add_order(self, order: Order, side: str):
+        """Adds an order to the back of the queue at its price."""
+        queues, levels, prices = self._side(side)
+        price = order.price
+        if price not in levels:
+            levels[price] = 0
+            queues[price] = OrderedDict()
+            bisect.insort(prices, price)
+        levels[price] += order.quantity
+        queues[price][order.order_id_str] = order
+        self._orders[order.order_id_str] = (order, side)
+        self._user_orders[order.user_id_str].add(order.order_id_str)
+        self._order_counts[side] += 1
 
     def remove_orders_by_user(self, user_id: uuid.UUID) -> list[tuple[Order, str]]:
         """Remove all orders belonging to user_id from both sides.
         Returns list of (order, side) tuples for escrow refund."""
-        removed: list[tuple[Order, str]] = []
-        kept_bids = []
-        for order in self.bids:
-            if order.user_id == user_id:
-                removed.append((order, "buy"))
-            else:
-                kept_bids.append(order)
-        self.bids = kept_bids
-
-        kept_asks = []
-        for order in self.asks:
-            if order.user_id == user_id:
-                removed.append((order, "sell"))
-            else:
-                kept_asks.append(order)
-        self.asks = kept_asks
-
+        user_orders = self._user_orders.get(str(user_id), ())
+        removed = [self._orders[oid] for oid in user_orders]
+        for order, side in removed:
+            self._remove(order, side)
         return removed
 
+    def get_order(self, order_id: str) -> tuple[Order, str] | None:
+        """The resting order with this id and its side, or None."""
+        return self._orders.get(order_id)
+
     def remove_order(self, order_id: uuid.UUID, side: str) -> Order | None:
         """Remove an order by ID from the specified side."""
-        book = self.bids if side == "buy" else self.asks
-        for i, order in enumerate(book):
-            if order.order_id == order_id:
-                return book.pop(i)
-        return None
+        entry = self._orders.get(str(order_id))
+        if entry is None or entry[1] != side:
+            return None
+        order = entry[0]
+        self._remove(order, side)
+        return order
+
+    def _remove(self, order: Order, side: str):
+        queues, _levels, _prices = self._side(side)
+        del queues[order.price][order.order_id_str]
+        self._forget(order, side)
+        self._reduce_level(side, order.price, order.quantity)
 
     def __repr__(self):
         """Provides a string representation for easy visualization of the order book."""
@@ -5,7 +5,8 @@ from pathlib import Path
 from uuid import UUID
 
 from api.auth import router as auth_router
-from api.dependencies import set_exchange
+from api.dependencies import set_db_writer, set_exchange, shutdown_bcrypt_pool
+from api.leaderboard import refresh_leaderboard_loop
 from api.leaderboard import router as leaderboard_router
 from api.market import router as market_router
 from api.portfolio import router as portfolio_router
@@ -14,6 +15,7 @@ from config import settings
 from core.user import User
 from db.crud import create_user, load_all_users
 from db.database import async_session, init_db
+from db.writer import DBWriter
 from engine.exchange import Exchange
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
@@ -33,7 +35,7 @@ async def _ensure_market_maker(exchange: Exchange) -> User:
             from api.dependencies import hash_password
 
             db_user = await create_user(
-                session, "__market_maker__", hash_password("bot")
+                session, "__market_maker__", await hash_password("bot")
             )
             from db.models import UserModel
             from sqlalchemy import update
@@ -81,40 +83,71 @@ async def lifespan(app: FastAPI):
     # Set singleton
     set_exchange(exchange)
 
-    # Wire WebSocket broadcasts on trades
-    def on_trades(ticker: str, trades):
-        asyncio.create_task(manager.broadcast_trades(ticker, trades))
-        asyncio.create_task(manager.broadcast_prices(exchange))
-        asyncio.create_task(manager.broadcast_orderbook(ticker, exchange))
+    # Background DB writer takes order/trade persistence off the request path
+    db_writer = DBWriter(async_session)
+    writer_task = db_writer.start()
+    set_db_writer(db_writer)
 
-    exchange.on_trades = on_trades
+    # Wire WebSocket broadcasts on trades — one task publishes each burst
+    broadcast_task = asyncio.create_task(manager.run(exchange))
+    exchange.on_trades = manager.notify_trades
 
     # Start market maker bots
     from bots.market_maker import MarketMakerBot
 
-    bot = MarketMakerBot(exchange, mm_user, session_factory=async_session)
+    bot = MarketMakerBot(
+        exchange,
+        mm_user,
+        session_factory=async_session,
+        persist_orders=settings.PERSIST_MM_ORDERS,
+    )
     bot_task = asyncio.create_task(bot.run())
     logger.info("Market maker bot started")
 
+    leaderboard_task = asyncio.create_task(refresh_leaderboard_loop(exchange))
+
     yield
 
-    # Shutdown
-    bot_task.cancel()
+    # Shutdown — stop producers, then flush queued writes before the final sync
+    for task in (bot_task, leaderboard_task, broadcast_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    try:
+        await db_writer.drain()
+    except RuntimeError:
+        logger.exception("DB writer stopped before its queue was flushed")
+    if db_writer.parked:
+        logger.error(
+            "%d DB writes still failing at shutdown; user balances are "
+            "re-synced below, their order and trade rows are lost",
+            db_writer.parked,
+        )
+    set_db_writer(None)
+    writer_task.cancel()
     try:
-        await bot_task
+        await writer_task
     except asyncio.CancelledError:
         pass
+    except Exception:
+        logger.exception("DB writer crashed")
 
-    # Persist all user state
+    # Persist user state not yet written by an order/cancel job
     async with async_session() as session:
-        from db.crud import sync_user_to_db
+        from db.crud import sync_users_to_db
 
-        for user in exchange.users.values():
-            if not user.is_market_maker:
-                await sync_user_to_db(session, user)
+        await sync_users_to_db(
+            session,
+            [u for u in exchange.users.values() if u.dirty and not u.is_market_maker],
+        )
         await session.commit()
     logger.info("User state persisted to database")
 
+    shutdown_bcrypt_pool()
+
 
 app = FastAPI(
     title="Market Sim",
@@ -126,7 +159,9 @@ app = FastAPI(
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
-    allow_credentials=True,
+    # Auth travels in headers, never cookies. Without credentials Starlette
+    # sends a fixed "*" instead of echoing each request's Origin
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -143,7 +178,7 @@ async def _authenticate_ws(
     token: str | None = None, api_key: str | None = None
 ) -> str | None:
     """Validate JWT or API key for WebSocket connections. Returns user_id or None."""
-    from api.dependencies import decode_jwt
+    from api.dependencies import decode_jwt, resolve_api_key
 
     if token:
         user_id = decode_jwt(token)
@@ -152,12 +187,10 @@ async def _authenticate_ws(
 
     if api_key:
         from db import database as db_module
-        from db.crud import get_user_by_api_key
 
+        # The session only connects on a cache miss
         async with db_module.async_session() as session:
-            db_user = await get_user_by_api_key(session, api_key)
-            if db_user:
-                return db_user.id
+            return await resolve_api_key(session, api_key)
 
     return None
 
@@ -181,6 +214,8 @@ async def ws_endpoint(
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, channel)
 
 
@@ -1,9 +1,10 @@
-import json
+import asyncio
 import logging
-import time
 from collections import defaultdict
+from contextlib import suppress
 
 from fastapi import WebSocket
+from pydantic_core import to_json
 
 logger = logging.getLogger("market-sim.ws")
 
@@ -12,16 +13,34 @@ class ConnectionManager:
     """Manages WebSocket connections with channel-based subscriptions."""
 
     def __init__(self):
-        self.channels: dict[str, list[WebSocket]] = defaultdict(list)
+        self.channels: dict[str, set[WebSocket]] = defaultdict(set)
         self._user_ids: dict[WebSocket, str | None] = {}
         self._last_orderbook_broadcast: dict[str, float] = {}
         self._orderbook_throttle = 0.5  # seconds
+        self._orderbook_depth = 25  # levels per side; the UI shows 15
+        # Trailing-edge sends for books that changed inside the throttle window
+        self._orderbook_timers: dict[str, asyncio.TimerHandle] = {}
+        # Trades waiting for the next coalesced broadcast, per ticker
+        self._pending_trades: dict[str, list] = defaultdict(list)
+        self._wakeup = asyncio.Event()
+        self._coalesce_window = 0.01  # seconds
+        # Each socket gets a bounded outbox drained by its own relay task
+        self._outboxes: dict[WebSocket, asyncio.Queue[str]] = {}
+        self._relays: dict[WebSocket, asyncio.Task] = {}
+        self._outbox_size = 32
+        # A send that takes longer than this marks the client as dead
+        self._send_timeout = 5.0  # seconds
 
     async def connect(
         self, websocket: WebSocket, channel: str, user_id: str | None = None
     ):
         await websocket.accept()
-        self.channels[channel].append(websocket)
+        outbox: asyncio.Queue[str] = asyncio.Queue(self._outbox_size)
+        self._outboxes[websocket] = outbox
+        self._relays[websocket] = asyncio.create_task(
+            self._relay(websocket, channel, outbox)
+        )
+        self.channels[channel].add(websocket)
         self._user_ids[websocket] = user_id
         logger.info(
             "WebSocket connected to channel: %s (user: %s)",
@@ -30,83 +49,133 @@ class ConnectionManager:
         )
 
     def disconnect(self, websocket: WebSocket, channel: str):
-        if websocket in self.channels[channel]:
-            self.channels[channel].remove(websocket)
+        self.channels[channel].discard(websocket)
         self._user_ids.pop(websocket, None)
+        self._outboxes.pop(websocket, None)
+        relay = self._relays.pop(websocket, None)
+        if relay is not None and relay is not asyncio.current_task():
+            relay.cancel()
         logger.info("WebSocket disconnected from channel: %s", channel)
 
-    async def _broadcast(self, channel: str, data: dict):
-        dead = []
-        for ws in self.channels[channel]:
+    async def _relay(self, websocket: WebSocket, channel: str, outbox):
+        """Deliver queued messages to one client; a failed or stalled send
+        drops it and closes the socket, which ends its endpoint loop."""
+        while True:
+            message = await outbox.get()
+            try:
+                async with asyncio.timeout(self._send_timeout):
+                    await websocket.send_text(message)
+            except Exception:
+                self.disconnect(websocket, channel)
+                with suppress(Exception):
+                    async with asyncio.timeout(self._send_timeout):
+                        await websocket.close()
+                return
+
+    def notify_trades(self, ticker: str, trades):
+        """Queue trades for broadcast. Safe to call from the exchange callback:
+        it only records the trades and wakes `run()`."""
+        self._pending_trades[ticker].extend(trades)
+        self._wakeup.set()
+
+    async def run(self, exchange):
+        """Publish queued trades, then prices and order books once per burst,
+        however many trade batches arrived in the coalescing window."""
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self._coalesce_window)
+            self._wakeup.clear()
+            pending, self._pending_trades = self._pending_trades, defaultdict(list)
+            if not self._outboxes:
+                continue  # nobody is connected
             try:
-                await ws.send_text(json.dumps(data))
+                for ticker, trades in pending.items():
+                    await self.broadcast_trades(ticker, trades)
+                await self.broadcast_prices(exchange)
+                for ticker in pending:
+                    await self.broadcast_orderbook(ticker, exchange)
             except Exception:
-                dead.append(ws)
-        for ws in dead:
-            if ws in self.channels[channel]:
-                self.channels[channel].remove(ws)
+                logger.exception("WebSocket broadcast failed")
+
+    def _broadcast(self, channel: str, data: dict):
+        if not self.channels.get(channel):
+            return
+        # Serialize once for every subscriber, with pydantic's Rust encoder
+        message = to_json(data).decode()
+        # Only enqueue — relay tasks do the sending, so a slow client never
+        # blocks the broadcaster. A full outbox sheds its oldest message.
+        for ws in self.channels[channel]:
+            outbox = self._outboxes[ws]
+            if outbox.full():
+                outbox.get_nowait()
+            outbox.put_nowait(message)
 
     async def broadcast_trades(self, ticker: str, trades):
+        """Publish a burst of trades as one message, oldest first."""
         channel = f"trades:{ticker}"
-        for trade in trades:
-            await self._broadcast(
-                channel,
-                {
-                    "type": "trade",
-                    "ticker": ticker,
-                    "price": trade.price,
-                    "quantity": trade.quantity,
-                    "timestamp": trade.timestamp,
-                },
-            )
+        if not self.channels.get(channel):
+            return  # don't build a payload nobody will receive
+        self._broadcast(
+            channel,
+            {
+                "type": "trades",
+                "ticker": ticker,
+                "data": [
+                    {
+                        "price": trade.price,
+                        "quantity": trade.quantity,
+                        "timestamp": trade.timestamp,
+                    }
+                    for trade in trades
+                ],
+            },
+        )
 
     async def broadcast_prices(self, exchange):
-        prices = {}
-        for ticker in exchange.order_books:
-            price = exchange.get_current_price(ticker)
-            book = exchange.order_books[ticker]
-            prices[ticker] = {
-                "current_price": price,
-                "best_bid": book.bids[0].price if book.bids else None,
-                "best_ask": book.asks[0].price if book.asks else None,
-            }
-        await self._broadcast(
+        if not self.channels.get("prices"):
+            return
+        self._broadcast(
             "prices",
-            {"type": "prices", "data": prices},
+            {"type": "prices", "data": exchange.quote_snapshot()},
         )
 
     async def broadcast_orderbook(self, ticker: str, exchange):
-        now = time.time()
-        last = self._last_orderbook_broadcast.get(ticker, 0)
-        if now - last < self._orderbook_throttle:
+        """Publish the book at most once per throttle window. Changes inside
+        the window schedule one trailing send, so the final state of a burst
+        always goes out."""
+        if not self.channels.get(f"orderbook:{ticker}"):
             return
-        self._last_orderbook_broadcast[ticker] = now
+        if ticker in self._orderbook_timers:
+            return  # the scheduled send will pick up this change
+        loop = asyncio.get_running_loop()
+        last = self._last_orderbook_broadcast.get(ticker)
+        wait = 0 if last is None else last + self._orderbook_throttle - loop.time()
+        if wait > 0:
+            self._orderbook_timers[ticker] = loop.call_later(
+                wait, self._send_orderbook, ticker, exchange
+            )
+        else:
+            self._send_orderbook(ticker, exchange)
+
+    def _send_orderbook(self, ticker: str, exchange):
+        self._orderbook_timers.pop(ticker, None)
+        self._last_orderbook_broadcast[ticker] = asyncio.get_running_loop().time()
 
         channel = f"orderbook:{ticker}"
         book = exchange.order_books.get(ticker)
         if not book:
             return
 
-        bid_levels: dict[float, int] = {}
-        for order in book.bids:
-            bid_levels[order.price] = bid_levels.get(order.price, 0) + order.quantity
-
-        ask_levels: dict[float, int] = {}
-        for order in book.asks:
-            ask_levels[order.price] = ask_levels.get(order.price, 0) + order.quantity
-
-        await self._broadcast(
+        # The book keeps per-price totals, so this is O(depth), not O(orders)
+        bids = book.price_levels("buy", self._orderbook_depth)
+        asks = book.price_levels("sell", self._orderbook_depth)
+        self._broadcast(
             channel,
             {
                 "type": "orderbook",
                 "ticker": ticker,
-                "bids": [
-                    {"price": p, "quantity": q}
-                    for p, q in sorted(bid_levels.items(), reverse=True)
-                ],
-                "asks": [
-                    {"price": p, "quantity": q} for p, q in sorted(ask_levels.items())
-                ],
+                "bids": [{"price": p, "quantity": q} for p, q in bids],
+                "asks": [{"price": p, "quantity": q} for p, q in asks],
             },
         )
 
@@ -53,6 +53,21 @@ describe("API client", () => {
     await expect(register("alice", "pass")).rejects.toThrow("Username taken");
   });
 
+  it("throws the first message of a validation error", async () => {
+    mockFetch.mockResolvedValue({
+      ok: false,
+      statusText: "Unprocessable Entity",
+      json: () =>
+        Promise.resolve({
+          detail: [{ loc: ["body", "price"], msg: "Input should be greater than 0" }],
+        }),
+    });
+
+    await expect(register("alice", "pass")).rejects.toThrow(
+      "Input should be greater than 0",
+    );
+  });
+
   it("registers a user with POST", async () => {
     const data = {
       user_id: "u1",
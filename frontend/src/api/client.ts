@@ -22,7 +22,9 @@ async function request<T>(
 
   if (!res.ok) {
     const body = await res.json().catch(() => ({ detail: res.statusText }));
-    throw new Error(body.detail || res.statusText);
+    // Request validation errors (422) carry a list of {loc, msg} items
+    const detail = Array.isArray(body.detail) ? body.detail[0]?.msg : body.detail;
+    throw new Error(detail || res.statusText);
   }
 
   return res.json();
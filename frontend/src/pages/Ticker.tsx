@@ -34,10 +34,11 @@ export default function Ticker() {
     const tradeWs = new WSClient(`trades:${symbol}`);
     tradeWs.connect();
     tradeWs.onMessage((msg: unknown) => {
-      const data = msg as { type: string; price: number; quantity: number; timestamp: number };
-      if (data.type === "trade") {
-        setCurrentPrice(data.price);
-        setTrades((prev) => [data, ...prev].slice(0, 50));
+      const data = msg as { type: string; data: Trade[] };
+      if (data.type === "trades" && data.data.length > 0) {
+        // One message per burst, oldest first; the list shows newest first
+        setCurrentPrice(data.data[data.data.length - 1].price);
+        setTrades((prev) => [...data.data].reverse().concat(prev).slice(0, 50));
       }
     });
     return () => tradeWs.disconnect();
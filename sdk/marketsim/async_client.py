@@ -0,0 +1,159 @@
+"""Async REST client for the Market-Sim API (requires the `async` extra)."""
+
+from __future__ import annotations
+
+import httpx
+
+from .client import (
+    _cancel_result,
+    _candles,
+    _history_params,
+    _open_orders,
+    _order_body,
+    _order_result,
+    _page_params,
+    _portfolio,
+    _ticker_infos,
+    _trade_results,
+)
+from .models import (
+    CancelResult,
+    Candle,
+    OpenOrder,
+    OrderResult,
+    Portfolio,
+    TickerInfo,
+    TradeResult,
+)
+
+
+class AsyncMarketSimClient:
+    """
+    Async twin of MarketSimClient. One pooled HTTP/2 connection carries
+    concurrent requests, so an agent can `asyncio.gather` many orders without
+    a thread per request. Use it as an async context manager, or call
+    `aclose()` when done.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        client: httpx.AsyncClient | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self._client = client or _new_client(self.base_url)
+        self._client.headers["X-API-Key"] = api_key
+
+    @classmethod
+    async def register(
+        cls, base_url: str, username: str, password: str
+    ) -> AsyncMarketSimClient:
+        """Register a new user and return an authenticated client."""
+        client = _new_client(base_url.rstrip("/"))
+        try:
+            resp = await client.post(
+                "/api/register",
+                json={"username": username, "password": password},
+            )
+            resp.raise_for_status()
+        except BaseException:
+            await client.aclose()
+            raise
+        return cls(base_url, resp.json()["api_key"], client=client)
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self) -> AsyncMarketSimClient:
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _get(self, path: str, **params):
+        resp = await self._client.get(path, params=params)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _post(self, path: str, json: dict):
+        resp = await self._client.post(path, json=json)
+        resp.raise_for_status()
+        return resp.json()
+
+    async def _delete(self, path: str):
+        resp = await self._client.delete(path)
+        resp.raise_for_status()
+        return resp.json()
+
+    # --- Market data (public) ---
+
+    async def get_tickers(self) -> dict[str, TickerInfo]:
+        return _ticker_infos(await self._get("/api/market/tickers"))
+
+    async def get_orderbook(self, ticker: str) -> dict:
+        return await self._get(f"/api/market/{ticker}/orderbook")
+
+    async def get_history(
+        self,
+        ticker: str,
+        interval: str = "5m",
+        start: str | None = None,
+        end: str | None = None,
+    ) -> list[Candle]:
+        params = _history_params(interval, start, end)
+        return _candles(await self._get(f"/api/market/{ticker}/history", **params))
+
+    async def get_leaderboard(self) -> list[dict]:
+        data = await self._get("/api/leaderboard")
+        return data["leaderboard"]
+
+    # --- Trading (authenticated) ---
+
+    async def place_order(
+        self,
+        ticker: str,
+        side: str,
+        price: float,
+        quantity: int,
+        time_in_force: str = "GTC",
+    ) -> OrderResult:
+        body = _order_body(ticker, side, price, quantity, time_in_force)
+        return _order_result(await self._post("/api/orders", json=body))
+
+    async def cancel_order(self, order_id: str) -> CancelResult:
+        return _cancel_result(await self._delete(f"/api/orders/{order_id}"))
+
+    async def get_orders(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        before: str | None = None,
+        before_id: str | None = None,
+    ) -> list[OpenOrder]:
+        params = _page_params(limit, offset, before, before_id)
+        return _open_orders(await self._get("/api/orders", **params))
+
+    async def get_trades(
+        self,
+        ticker: str | None = None,
+        limit: int = 50,
+        offset: int = 0,
+        before: str | None = None,
+        before_id: str | None = None,
+    ) -> list[TradeResult]:
+        params = _page_params(limit, offset, before, before_id)
+        if ticker:
+            params["ticker"] = ticker
+        return _trade_results(await self._get("/api/trades", **params))
+
+    async def get_portfolio(self) -> Portfolio:
+        return _portfolio(await self._get("/api/portfolio"))
+
+
+def _new_client(base_url: str) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
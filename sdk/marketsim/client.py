@@ -19,21 +19,28 @@ from .models import (
 class MarketSimClient:
     """Sync client wrapping all Market-Sim REST endpoints."""
 
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        session: requests.Session | None = None,
+    ):
         self.base_url = base_url.rstrip("/")
-        self._session = requests.Session()
+        self._session = session or requests.Session()
         self._session.headers["X-API-Key"] = api_key
 
     @classmethod
     def register(cls, base_url: str, username: str, password: str) -> "MarketSimClient":
         """Register a new user and return an authenticated client."""
-        resp = requests.post(
+        # The client keeps this session, so its pooled connection is reused
+        session = requests.Session()
+        resp = session.post(
             f"{base_url.rstrip('/')}/api/register",
             json={"username": username, "password": password},
         )
         resp.raise_for_status()
         data = resp.json()
-        return cls(base_url, data["api_key"])
+        return cls(base_url, data["api_key"], session=session)
 
     def _get(self, path: str, **params) -> dict:
         resp = self._session.get(f"{self.base_url}{path}", params=params)
@@ -53,15 +60,7 @@ class MarketSimClient:
     # --- Market data (public) ---
 
     def get_tickers(self) -> dict[str, TickerInfo]:
-        data = self._get("/api/market/tickers")
-        return {
-            ticker: TickerInfo(
-                current_price=info["current_price"],
-                best_bid=info["best_bid"],
-                best_ask=info["best_ask"],
-            )
-            for ticker, info in data["tickers"].items()
-        }
+        return _ticker_infos(self._get("/api/market/tickers"))
 
     def get_orderbook(self, ticker: str) -> dict:
         return self._get(f"/api/market/{ticker}/orderbook")
@@ -73,23 +72,8 @@ class MarketSimClient:
         start: str | None = None,
         end: str | None = None,
     ) -> list[Candle]:
-        params: dict = {"interval": interval}
-        if start:
-            params["start"] = start
-        if end:
-            params["end"] = end
-        data = self._get(f"/api/market/{ticker}/history", **params)
-        return [
-            Candle(
-                timestamp=c["timestamp"],
-                open=c["open"],
-                high=c["high"],
-                low=c["low"],
-                close=c["close"],
-                volume=c["volume"],
-            )
-            for c in data["candles"]
-        ]
+        params = _history_params(interval, start, end)
+        return _candles(self._get(f"/api/market/{ticker}/history", **params))
 
     def get_leaderboard(self) -> list[dict]:
         data = self._get("/api/leaderboard")
@@ -105,91 +89,168 @@ class MarketSimClient:
         quantity: int,
         time_in_force: str = "GTC",
     ) -> OrderResult:
-        data = self._post(
-            "/api/orders",
-            json={
-                "ticker": ticker,
-                "side": side,
-                "price": price,
-                "quantity": quantity,
-                "time_in_force": time_in_force,
-            },
-        )
-        return OrderResult(
-            order_id=data["order_id"],
-            ticker=data["ticker"],
-            side=data["side"],
-            price=data["price"],
-            quantity=data["quantity"],
-            filled_quantity=data["filled_quantity"],
-            status=data["status"],
-            trades=data["trades"],
-        )
+        body = _order_body(ticker, side, price, quantity, time_in_force)
+        return _order_result(self._post("/api/orders", json=body))
 
     def cancel_order(self, order_id: str) -> CancelResult:
-        data = self._delete(f"/api/orders/{order_id}")
-        return CancelResult(
-            order_id=data["order_id"],
-            status=data["status"],
-            message=data["message"],
-        )
+        return _cancel_result(self._delete(f"/api/orders/{order_id}"))
 
-    def get_orders(self, limit: int = 50, offset: int = 0) -> list[OpenOrder]:
-        data = self._get("/api/orders", limit=limit, offset=offset)
-        return [
-            OpenOrder(
-                order_id=o["order_id"],
-                ticker=o["ticker"],
-                side=o["side"],
-                price=o["price"],
-                quantity=o["quantity"],
-                filled_quantity=o["filled_quantity"],
-                status=o["status"],
-                created_at=o["created_at"],
-            )
-            for o in data
-        ]
+    def get_orders(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        before: str | None = None,
+        before_id: str | None = None,
+    ) -> list[OpenOrder]:
+        params = _page_params(limit, offset, before, before_id)
+        return _open_orders(self._get("/api/orders", **params))
 
     def get_trades(
         self,
         ticker: str | None = None,
         limit: int = 50,
         offset: int = 0,
+        before: str | None = None,
+        before_id: str | None = None,
     ) -> list[TradeResult]:
-        params: dict = {"limit": limit, "offset": offset}
+        params = _page_params(limit, offset, before, before_id)
         if ticker:
             params["ticker"] = ticker
-        data = self._get("/api/trades", **params)
-        return [
-            TradeResult(
-                trade_id=t["trade_id"],
-                ticker=t["ticker"],
-                price=t["price"],
-                quantity=t["quantity"],
-                side=t["side"],
-                counterparty_id=t["counterparty_id"],
-                order_id=t["order_id"],
-                created_at=t["created_at"],
-            )
-            for t in data
-        ]
+        return _trade_results(self._get("/api/trades", **params))
 
     def get_portfolio(self) -> Portfolio:
-        data = self._get("/api/portfolio")
-        return Portfolio(
-            user_id=data["user_id"],
-            username=data["username"],
-            cash=data["cash"],
-            buying_power=data["buying_power"],
-            escrowed_cash=data["escrowed_cash"],
-            holdings=[
-                Holding(
-                    ticker=h["ticker"],
-                    quantity=h["quantity"],
-                    current_price=h["current_price"],
-                    value=h["value"],
-                )
-                for h in data["holdings"]
-            ],
-            total_value=data["total_value"],
+        return _portfolio(self._get("/api/portfolio"))
+
+
+# Request builders and response parsers, shared with AsyncMarketSimClient
+
+
+def _history_params(interval: str, start: str | None, end: str | None) -> dict:
+    params: dict = {"interval": interval}
+    if start:
+        params["start"] = start
+    if end:
+        params["end"] = end
+    return params
+
+
+def _page_params(
+    limit: int, offset: int, before: str | None, before_id: str | None
+) -> dict:
+    # Keyset cursor: the created_at and id of the last row already seen
+    params: dict = {"limit": limit, "offset": offset}
+    if before:
+        params["before"] = before
+    if before_id:
+        params["before_id"] = before_id
+    return params
+
+
+def _order_body(
+    ticker: str, side: str, price: float, quantity: int, time_in_force: str
+) -> dict:
+    return {
+        "ticker": ticker,
+        "side": side,
+        "price": price,
+        "quantity": quantity,
+        "time_in_force": time_in_force,
+    }
+
+
+def _ticker_infos(data: dict) -> dict[str, TickerInfo]:
+    return {
+        ticker: TickerInfo(
+            current_price=info["current_price"],
+            best_bid=info["best_bid"],
+            best_ask=info["best_ask"],
+        )
+        for ticker, info in data["tickers"].items()
+    }
+
+
+def _candles(data: dict) -> list[Candle]:
+    return [
+        Candle(
+            timestamp=c["timestamp"],
+            open=c["open"],
+            high=c["high"],
+            low=c["low"],
+            close=c["close"],
+            volume=c["volume"],
+        )
+        for c in data["candles"]
+    ]
+
+
+def _order_result(data: dict) -> OrderResult:
+    return OrderResult(
+        order_id=data["order_id"],
+        ticker=data["ticker"],
+        side=data["side"],
+        price=data["price"],
+        quantity=data["quantity"],
+        filled_quantity=data["filled_quantity"],
+        status=data["status"],
+        trades=data["trades"],
+    )
+
+
+def _cancel_result(data: dict) -> CancelResult:
+    return CancelResult(
+        order_id=data["order_id"],
+        status=data["status"],
+        message=data["message"],
+    )
+
+
+def _open_orders(data: list[dict]) -> list[OpenOrder]:
+    return [
+        OpenOrder(
+            order_id=o["order_id"],
+            ticker=o["ticker"],
+            side=o["side"],
+            price=o["price"],
+            quantity=o["quantity"],
+            filled_quantity=o["filled_quantity"],
+            status=o["status"],
+            created_at=o["created_at"],
         )
+        for o in data
+    ]
+
+
+def _trade_results(data: list[dict]) -> list[TradeResult]:
+    return [
+        TradeResult(
+            trade_id=t["trade_id"],
+            ticker=t["ticker"],
+            price=t["price"],
+            quantity=t["quantity"],
+            side=t["side"],
+            counterparty_id=t["counterparty_id"],
+            order_id=t["order_id"],
+            created_at=t["created_at"],
+        )
+        for t in data
+    ]
+
+
+def _portfolio(data: dict) -> Portfolio:
+    return Portfolio(
+        user_id=data["user_id"],
+        username=data["username"],
+        cash=data["cash"],
+        buying_power=data["buying_power"],
+        escrowed_cash=data["escrowed_cash"],
+        holdings=[
+            Holding(
+                ticker=h["ticker"],
+                quantity=h["quantity"],
+                current_price=h["current_price"],
+                value=h["value"],
+            )
+            for h in data["holdings"]
+        ],
+        total_value=data["total_value"],
+    )
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(slots=True)
 class OrderResult:
     order_id: str
     ticker: str
@@ -14,7 +14,7 @@ class OrderResult:
     trades: list[dict]
 
 
-@dataclass
+@dataclass(slots=True)
 class OpenOrder:
     order_id: str
     ticker: str
@@ -26,7 +26,7 @@ class OpenOrder:
     created_at: str
 
 
-@dataclass
+@dataclass(slots=True)
 class TradeResult:
     trade_id: str
     ticker: str
@@ -38,7 +38,7 @@ class TradeResult:
     created_at: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Holding:
     ticker: str
     quantity: int
@@ -46,7 +46,7 @@ class Holding:
     value: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Portfolio:
     user_id: str
     username: str
@@ -57,7 +57,7 @@ class Portfolio:
     total_value: float
 
 
-@dataclass
+@dataclass(slots=True)
 class Candle:
     timestamp: str
     open: float
@@ -67,14 +67,14 @@ class Candle:
     volume: int
 
 
-@dataclass
+@dataclass(slots=True)
 class TickerInfo:
     current_price: Optional[float]
     best_bid: Optional[float]
     best_ask: Optional[float]
 
 
-@dataclass
+@dataclass(slots=True)
 class CancelResult:
     order_id: str
     status: str
@@ -34,12 +34,14 @@ class MarketSimWS:
         url = f"{self._ws_base}/ws/{channel}"
         while True:
             try:
-                async with websockets.connect(url) as ws:
+                # No permessage-deflate: messages are small, and compression
+                # costs the server a zlib pass per subscriber on every broadcast
+                async with websockets.connect(url, compression=None) as ws:
                     self._connections[channel] = ws
                     async for message in ws:
-                        data = json.loads(message)
-                        for cb in self._callbacks.get(channel, []):
-                            cb(data)
+                        for data in _expand(json.loads(message)):
+                            for cb in self._callbacks.get(channel, []):
+                                cb(data)
             except (
                 websockets.ConnectionClosed,
                 ConnectionRefusedError,
@@ -63,3 +65,10 @@ class MarketSimWS:
             await ws.close()
         self._tasks.clear()
         self._connections.clear()
+
+
+def _expand(data: dict) -> list[dict]:
+    """Split a batched trades message so callbacks still get one trade each."""
+    if data.get("type") != "trades":
+        return [data]
+    return [{"type": "trade", "ticker": data["ticker"], **t} for t in data["data"]]
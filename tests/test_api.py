@@ -2,6 +2,7 @@ import uuid
 
 import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import create_async_engine
 
 
 @pytest.mark.asyncio
@@ -11,6 +12,15 @@ async def test_health(client: AsyncClient):
     assert resp.json() == {"status": "ok"}
 
 
+@pytest.mark.asyncio
+async def test_cors_allows_any_origin_without_credentials(client: AsyncClient):
+    resp = await client.get(
+        "/api/health", headers={"Origin": "https://agent.example.com"}
+    )
+    assert resp.headers["access-control-allow-origin"] == "*"
+    assert "access-control-allow-credentials" not in resp.headers
+
+
 @pytest.mark.asyncio
 async def test_register_and_login(client: AsyncClient):
     # Register
@@ -78,6 +88,13 @@ async def test_orderbook(client: AsyncClient):
     assert "asks" in data
 
 
+@pytest.mark.asyncio
+async def test_orderbook_unknown_ticker(client: AsyncClient):
+    resp = await client.get("/api/market/NOPE/orderbook")
+    assert resp.status_code == 200
+    assert resp.json() == {"error": "Ticker 'NOPE' not found"}
+
+
 @pytest.mark.asyncio
 async def test_place_order_unauthenticated(client: AsyncClient):
     resp = await client.post(
@@ -141,6 +158,53 @@ async def test_leaderboard(client: AsyncClient):
     assert "leaderboard" in data
 
 
+@pytest.mark.asyncio
+async def test_leaderboard_values_holdings_and_ranks(client: AsyncClient):
+    """Holdings are valued at current price and users ranked by total value."""
+    from uuid import UUID
+
+    from api.dependencies import get_exchange
+
+    exchange = await get_exchange()
+    for name in ("lb_poor", "lb_rich"):
+        resp = await client.post(
+            "/api/register", json={"username": name, "password": "pass1234"}
+        )
+        if name == "lb_rich":
+            rich = exchange.get_user(UUID(resp.json()["user_id"]))
+            rich.portfolio["FUN"] = 10
+
+    resp = await client.get("/api/leaderboard")
+    board = resp.json()["leaderboard"]
+    assert [e["username"] for e in board] == ["lb_rich", "lb_poor"]
+    fun_price = exchange.get_current_price("FUN")
+    assert board[0]["total_value"] == round(10000.0 + 10 * fun_price, 2)
+    assert board[0]["holdings"] == [{"ticker": "FUN", "quantity": 10}]
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_served_from_refresh_cache(client: AsyncClient):
+    """With the refresher running, requests get its last snapshot."""
+    import asyncio
+
+    from api.dependencies import get_exchange
+    from api.leaderboard import refresh_leaderboard_loop
+
+    task = asyncio.create_task(refresh_leaderboard_loop(await get_exchange(), 60))
+    try:
+        await asyncio.sleep(0)  # first refresh runs immediately
+
+        await client.post(
+            "/api/register", json={"username": "lb_late", "password": "pass1234"}
+        )
+        resp = await client.get("/api/leaderboard")
+        assert resp.status_code == 200
+        usernames = [e["username"] for e in resp.json()["leaderboard"]]
+        assert "lb_late" not in usernames  # registered after the snapshot
+    finally:
+        task.cancel()
+
+
 # --- Order cancellation integration tests ---
 
 
@@ -198,6 +262,65 @@ async def test_cancel_nonexistent_404(client: AsyncClient):
     assert resp.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_cancel_order_missing_from_db(client: AsyncClient, db_session):
+    """An order still on the book whose row hasn't been written yet (e.g.
+    parked behind a failed write) can still be cancelled."""
+    from db.models import OrderModel
+    from sqlalchemy import delete
+
+    resp = await client.post(
+        "/api/register",
+        json={"username": "cancel_unwritten", "password": "pass1234"},
+    )
+    headers = {"X-API-Key": resp.json()["api_key"]}
+    resp = await client.get("/api/portfolio", headers=headers)
+    initial_cash = resp.json()["cash"]
+
+    resp = await client.post(
+        "/api/orders",
+        json={"ticker": "FUN", "side": "buy", "price": 50.0, "quantity": 10},
+        headers=headers,
+    )
+    order_id = resp.json()["order_id"]
+    await db_session.execute(delete(OrderModel).where(OrderModel.id == order_id))
+    await db_session.commit()
+
+    resp = await client.delete(f"/api/orders/{order_id}", headers=headers)
+    assert resp.status_code == 200
+    resp = await client.get("/api/portfolio", headers=headers)
+    assert resp.json()["cash"] == initial_cash
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cancels_refund_once(client: AsyncClient):
+    """Two racing cancels of one order: one succeeds, escrow refunded once."""
+    import asyncio
+
+    resp = await client.post(
+        "/api/register",
+        json={"username": "race_cancel_user", "password": "pass1234"},
+    )
+    headers = {"X-API-Key": resp.json()["api_key"]}
+
+    resp = await client.post(
+        "/api/orders",
+        json={"ticker": "FUN", "side": "buy", "price": 50.0, "quantity": 10},
+        headers=headers,
+    )
+    order_id = resp.json()["order_id"]
+
+    results = await asyncio.gather(
+        client.delete(f"/api/orders/{order_id}", headers=headers),
+        client.delete(f"/api/orders/{order_id}", headers=headers),
+    )
+    assert sorted(r.status_code for r in results) == [200, 400]
+
+    resp = await client.get("/api/portfolio", headers=headers)
+    assert resp.json()["cash"] == 10000.0
+    assert resp.json()["escrowed_cash"] == 0.0
+
+
 @pytest.mark.asyncio
 async def test_cancel_other_users_order_403(client: AsyncClient):
     # Register user A
@@ -401,11 +524,12 @@ async def test_get_trades_empty(client: AsyncClient):
 
 @pytest.mark.asyncio
 async def test_get_trades_after_fill(client: AsyncClient):
+    from datetime import datetime
     from uuid import UUID
 
     from api.dependencies import get_exchange
 
-    exchange = get_exchange()
+    exchange = await get_exchange()
 
     # Register two users
     resp = await client.post(
@@ -450,6 +574,8 @@ async def test_get_trades_after_fill(client: AsyncClient):
     buyer_trade = [t for t in trades if t["ticker"] == "FUN" and t["price"] == 85.0]
     assert len(buyer_trade) == 1
     assert buyer_trade[0]["side"] == "buy"
+    assert isinstance(buyer_trade[0]["created_at"], str)
+    datetime.fromisoformat(buyer_trade[0]["created_at"])
 
     # Seller sees side="sell"
     resp = await client.get("/api/trades", headers={"X-API-Key": seller_key})
@@ -469,6 +595,64 @@ async def test_get_trades_unauthenticated(client: AsyncClient):
 # --- Buying power tests ---
 
 
+@pytest.mark.asyncio
+async def test_open_orders_and_trades_keyset_pagination(db_session):
+    """`before` pages newest-first by (created_at, id), so rows sharing a
+    timestamp across a page break are neither skipped nor repeated."""
+    from datetime import datetime
+
+    from db.crud import get_open_orders, get_user_trades
+    from db.models import OrderModel, TradeModel
+
+    uid = str(uuid.uuid4())
+    # Three rows share the middle timestamp, as a bulk insert can produce
+    stamps = [datetime.fromisoformat(f"2026-01-01T00:00:0{i}") for i in (0, 1, 1, 1, 2)]
+    for ts in stamps:
+        db_session.add(
+            OrderModel(
+                id=str(uuid.uuid4()),
+                user_id=uid,
+                ticker="FUN",
+                side="buy",
+                price=10.0,
+                quantity=1,
+                status="open",
+                created_at=ts,
+            )
+        )
+        db_session.add(
+            TradeModel(
+                ticker="FUN",
+                price=10.0,
+                quantity=1,
+                buyer_id=uid,
+                seller_id=str(uuid.uuid4()),
+                buy_order_id=str(uuid.uuid4()),
+                sell_order_id=str(uuid.uuid4()),
+                created_at=ts,
+            )
+        )
+    await db_session.commit()
+
+    pages, cursor = [], None
+    while page := await get_open_orders(db_session, uid, limit=2, before=cursor):
+        pages.append(page)
+        cursor = (page[-1].created_at, page[-1].id)
+    seen = [o for page in pages for o in page]
+    assert len(pages) == 3 and len({o.id for o in seen}) == 5
+    assert [o.created_at for o in seen] == sorted(stamps, reverse=True)
+
+    first = await get_user_trades(db_session, uid, limit=2)
+    rest = await get_user_trades(
+        db_session, uid, limit=10, before=(first[-1].created_at, first[-1].id)
+    )
+    assert len({t.id for t in first + rest}) == 5
+
+    # A timestamp alone returns only strictly older rows
+    older = await get_user_trades(db_session, uid, before=(stamps[1], ""))
+    assert [t.created_at for t in older] == [stamps[0]]
+
+
 @pytest.mark.asyncio
 async def test_portfolio_buying_power_no_orders(client: AsyncClient):
     resp = await client.post(
@@ -529,7 +713,7 @@ async def test_history_with_trades(client: AsyncClient):
 
     from api.dependencies import get_exchange
 
-    exchange = get_exchange()
+    exchange = await get_exchange()
 
     # Register two users and create a trade
     resp = await client.post(
@@ -577,6 +761,112 @@ async def test_history_with_trades(client: AsyncClient):
     assert candle["volume"] == 5
 
 
+@pytest.mark.asyncio
+async def test_history_buckets_multiple_candles(client: AsyncClient, db_session):
+    """Trades spanning two 1m buckets produce two correct OHLCV candles."""
+    from datetime import datetime
+
+    from db.models import TradeModel
+
+    uid = str(uuid.uuid4())
+    ticks = [
+        ("00:00:10", 10.0, 1),
+        ("00:00:50", 12.0, 2),
+        ("00:01:05", 11.0, 3),
+        ("00:01:30", 9.0, 1),
+    ]
+    for ts, price, qty in ticks:
+        db_session.add(
+            TradeModel(
+                ticker="HODL",
+                price=price,
+                quantity=qty,
+                buyer_id=uid,
+                seller_id=uid,
+                buy_order_id=str(uuid.uuid4()),
+                sell_order_id=str(uuid.uuid4()),
+                created_at=datetime.fromisoformat(f"2026-01-01T{ts}"),
+            )
+        )
+    await db_session.commit()
+
+    resp = await client.get(
+        "/api/market/HODL/history",
+        params={
+            "interval": "1m",
+            "start": "2026-01-01T00:00:00Z",
+            "end": "2026-01-01T01:00:00Z",
+        },
+    )
+    assert resp.status_code == 200
+    candles = resp.json()["candles"]
+    assert [c["timestamp"] for c in candles] == [
+        "2026-01-01T00:00:00+00:00",
+        "2026-01-01T00:01:00+00:00",
+    ]
+    assert [
+        (c["open"], c["high"], c["low"], c["close"], c["volume"]) for c in candles
+    ] == [
+        (10.0, 12.0, 10.0, 12.0, 3),
+        (11.0, 11.0, 9.0, 9.0, 4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_candles_break_timestamp_ties_by_id(db_session):
+    """Trades with the same created_at open and close the candle in id order,
+    whatever order they were inserted in."""
+    from datetime import datetime
+
+    from db.crud import get_candles_for_ticker
+    from db.models import TradeModel
+
+    uid = str(uuid.uuid4())
+    at = datetime.fromisoformat("2026-01-01T00:00:30")
+    for trade_id, price in (("b", 12.0), ("a", 10.0), ("c", 11.0)):
+        db_session.add(
+            TradeModel(
+                id=trade_id,
+                ticker="TIE",
+                price=price,
+                quantity=1,
+                buyer_id=uid,
+                seller_id=uid,
+                buy_order_id=str(uuid.uuid4()),
+                sell_order_id=str(uuid.uuid4()),
+                created_at=at,
+            )
+        )
+    await db_session.commit()
+
+    [(_, open_, high, low, close, volume)] = await get_candles_for_ticker(
+        db_session, "TIE", 60
+    )
+    assert (open_, high, low, close, volume) == (10.0, 12.0, 10.0, 11.0, 3)
+
+
+@pytest.mark.asyncio
+async def test_candles_truncate_epoch_on_postgres():
+    """On Postgres the bucket epoch is floored, not rounded, before the cast."""
+    from types import SimpleNamespace
+
+    from db.crud import get_candles_for_ticker
+    from sqlalchemy.dialects import postgresql
+
+    statements = []
+
+    async def execute(stmt):
+        statements.append(stmt)
+        return SimpleNamespace(all=list)
+
+    bind = SimpleNamespace(dialect=postgresql.dialect())
+    session = SimpleNamespace(get_bind=lambda: bind, execute=execute)
+    await get_candles_for_ticker(session, "FUN", 60)
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "CAST(floor(EXTRACT(epoch FROM trades.created_at)) AS INTEGER)" in sql
+
+
 @pytest.mark.asyncio
 async def test_history_invalid_ticker(client: AsyncClient):
     resp = await client.get("/api/market/FAKE/history")
@@ -636,7 +926,25 @@ async def test_invalid_time_in_force(client: AsyncClient):
         },
         headers={"X-API-Key": api_key},
     )
-    assert resp.status_code == 400
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_invalid_order_fields_rejected(client: AsyncClient):
+    """Side, price and quantity are validated by the request model."""
+    resp = await client.post(
+        "/api/register",
+        json={"username": "bad_fields", "password": "pass1234"},
+    )
+    headers = {"X-API-Key": resp.json()["api_key"]}
+    valid = {"ticker": "FUN", "side": "buy", "price": 50.0, "quantity": 5}
+
+    for field, value in (("side", "hold"), ("price", 0), ("quantity", -1)):
+        resp = await client.post(
+            "/api/orders", json={**valid, field: value}, headers=headers
+        )
+        assert resp.status_code == 422
+        assert resp.json()["detail"][0]["loc"] == ["body", field]
 
 
 # --- Rate limiting tests ---
@@ -700,6 +1008,28 @@ async def test_rate_limit_exceeded(client: AsyncClient):
         app.dependency_overrides.pop(get_rate_limiter, None)
 
 
+def test_rate_limit_refills_over_window(monkeypatch):
+    """Token bucket refills at max_requests per window after a burst."""
+    from api import rate_limit
+    from api.rate_limit import RateLimiter
+    from fastapi import HTTPException
+
+    now = 1000.0
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now)
+    limiter = RateLimiter(max_requests=2, window_seconds=60)
+    uid = uuid.uuid4()
+
+    limiter.check(uid)
+    limiter.check(uid)
+    with pytest.raises(HTTPException):
+        limiter.check(uid)
+
+    now += 30  # half a window refills one token
+    limiter.check(uid)
+    with pytest.raises(HTTPException):
+        limiter.check(uid)
+
+
 # --- Phase 3: Data Consistency tests ---
 
 
@@ -710,7 +1040,7 @@ async def test_resting_order_filled_quantity_updates(client: AsyncClient):
 
     from api.dependencies import get_exchange
 
-    exchange = get_exchange()
+    exchange = await get_exchange()
 
     # Register seller and two buyers
     resp = await client.post(
@@ -785,7 +1115,7 @@ async def test_place_order_atomic_consistency(client: AsyncClient):
 
     from api.dependencies import get_exchange
 
-    exchange = get_exchange()
+    exchange = await get_exchange()
 
     # Register seller
     resp = await client.post(
@@ -868,7 +1198,9 @@ async def test_market_maker_persists_orders(db_engine, db_session):
     session_factory = async_sessionmaker(
         db_engine, class_=AsyncSession, expire_on_commit=False
     )
-    bot = MarketMakerBot(exchange, mm_user, session_factory=session_factory)
+    bot = MarketMakerBot(
+        exchange, mm_user, session_factory=session_factory, persist_orders=True
+    )
 
     # Quote one ticker
     await bot._quote_ticker("FUN")
@@ -884,6 +1216,114 @@ async def test_market_maker_persists_orders(db_engine, db_session):
     sides = {o.side for o in orders}
     assert sides == {"buy", "sell"}
 
+    # A re-quote cancels both stale orders in one batch
+    bot._quotes.clear()
+    await bot._quote_ticker("FUN")
+    db_session.expire_all()
+    result = await db_session.execute(
+        select(OrderModel.status).where(OrderModel.user_id == str(mm_user.user_id))
+    )
+    assert sorted(result.scalars().all()) == ["cancelled"] * 2 + ["open"] * 2
+
+
+@pytest.mark.asyncio
+async def test_market_maker_cycle_quotes_every_ticker():
+    """One run() cycle quotes all tickers, even if one of them fails."""
+    import asyncio
+
+    from bots.market_maker import MarketMakerBot
+    from core.user import User
+    from engine.exchange import Exchange
+
+    exchange = Exchange()
+    for ticker in ("AAA", "BBB", "CCC"):
+        exchange.add_ticker(ticker, initial_price=10.0)
+    mm_user = User(username="__mm_cycle__", cash=0, is_market_maker=True)
+    exchange.register_user(mm_user)
+
+    class FlakyBot(MarketMakerBot):
+        async def _place_quotes(self, ticker: str):
+            if ticker == "BBB":
+                raise RuntimeError("boom")
+            return await super()._place_quotes(ticker)
+
+    task = asyncio.create_task(FlakyBot(exchange, mm_user, interval=60).run())
+    try:
+        for _ in range(10):
+            await asyncio.sleep(0)
+    finally:
+        task.cancel()
+
+    quoted = {t for t, book in exchange.order_books.items() if book.bids}
+    assert quoted == {"AAA", "CCC"}
+
+
+@pytest.mark.asyncio
+async def test_market_maker_keeps_quotes_while_price_is_steady():
+    """An unchanged price leaves resting quotes alone; a fill refreshes them."""
+    from bots.market_maker import MarketMakerBot
+    from core.order import Order
+    from core.user import User
+    from engine.exchange import Exchange
+
+    exchange = Exchange()
+    exchange.add_ticker("FUN", initial_price=100.0)
+    mm_user = User(username="__mm_steady__", cash=0, is_market_maker=True)
+    buyer = User(username="mm_steady_buyer")
+    exchange.register_user(mm_user)
+    exchange.register_user(buyer)
+    bot = MarketMakerBot(exchange, mm_user)
+    book = exchange.order_books["FUN"]
+
+    await bot._quote_ticker("FUN")
+    first_bid = book.bids[0]
+    await bot._quote_ticker("FUN")
+    assert book.bids[0] is first_bid
+
+    # Lift one share of the MM ask: its quote is no longer whole
+    await exchange.place_order(
+        "FUN", Order(price=105.0, quantity=1, user_id=buyer.user_id), "buy"
+    )
+    await bot._quote_ticker("FUN")
+    assert book.bids[0] is not first_bid
+
+
+@pytest.mark.asyncio
+async def test_market_maker_skips_quotes_keeps_trades(db_engine, db_session):
+    """By default MM quotes are not persisted, but its trades with users are."""
+    from bots.market_maker import MarketMakerBot
+    from core.order import Order
+    from core.user import User
+    from db.models import OrderModel, TradeModel
+    from engine.exchange import Exchange
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    exchange = Exchange()
+    exchange.add_ticker("FUN", initial_price=100.0)
+    mm_user = User(username="__mm_test__", cash=0, is_market_maker=True)
+    seller = User(username="mm_seller")
+    seller.portfolio["FUN"] = 10
+    exchange.register_user(mm_user)
+    exchange.register_user(seller)
+    # Resting ask below the MM's next bid (99.0)
+    await exchange.place_order(
+        "FUN", Order(price=95.0, quantity=3, user_id=seller.user_id), "sell"
+    )
+
+    session_factory = async_sessionmaker(
+        db_engine, class_=AsyncSession, expire_on_commit=False
+    )
+    bot = MarketMakerBot(exchange, mm_user, session_factory=session_factory)
+    await bot._quote_ticker("FUN")
+
+    orders = await db_session.execute(
+        select(OrderModel).where(OrderModel.user_id == mm_user.user_id_str)
+    )
+    assert orders.scalars().all() == []
+    trades = (await db_session.execute(select(TradeModel))).scalars().all()
+    assert [(t.seller_id, t.quantity) for t in trades] == [(seller.user_id_str, 3)]
+
 
 @pytest.mark.asyncio
 async def test_leaderboard_crud_no_n_plus_one(db_session):
@@ -894,6 +1334,7 @@ async def test_leaderboard_crud_no_n_plus_one(db_session):
     user1 = await create_user(db_session, "lb_user1", "hash1")
     user2 = await create_user(db_session, "lb_user2", "hash2")
     await update_holding(db_session, user1.id, "FUN", 10)
+    await update_holding(db_session, user1.id, "MEME", 0)
     await update_holding(db_session, user2.id, "MEME", 5)
     await db_session.commit()
 
@@ -909,6 +1350,165 @@ async def test_leaderboard_crud_no_n_plus_one(db_session):
     assert user1_entry["holdings"][0]["ticker"] == "FUN"
 
 
+@pytest.mark.asyncio
+async def test_load_all_users_eager_loads_holdings(db_session):
+    """load_all_users reads holdings eagerly; lazy loads would raise."""
+    from db.crud import create_user, load_all_users, update_holding
+
+    user1 = await create_user(db_session, "load_user1", "hash1")
+    user2 = await create_user(db_session, "load_user2", "hash2")
+    await update_holding(db_session, user1.id, "FUN", 10)
+    await update_holding(db_session, user1.id, "MEME", 0)
+    await update_holding(db_session, user2.id, "MEME", 5)
+    await db_session.commit()
+
+    users = {u.username: u for u in await load_all_users(db_session)}
+    assert users["load_user1"].portfolio == {"FUN": 10}
+    assert users["load_user2"].portfolio == {"MEME": 5}
+
+
+@pytest.mark.asyncio
+async def test_sync_users_to_db_bulk(db_session):
+    """sync_users_to_db writes cash and holdings for every user passed."""
+    from core.user import User
+    from db.crud import create_user, get_user_by_id, sync_users_to_db
+    from db.models import PortfolioHolding
+    from sqlalchemy import select
+
+    async def get_holdings(session, user_id):
+        result = await session.execute(
+            select(PortfolioHolding).where(PortfolioHolding.user_id == user_id)
+        )
+        return list(result.scalars().all())
+
+    ids = [(await create_user(db_session, f"sync_{i}", "hash")).id for i in range(3)]
+    users = [
+        User(
+            user_id=uuid.UUID(uid),
+            cash=1000.0 * (i + 1),
+            portfolio={"FUN": i + 1},
+        )
+        for i, uid in enumerate(ids)
+    ]
+    await sync_users_to_db(db_session, users)
+    await db_session.commit()
+
+    for i, uid in enumerate(ids):
+        refreshed = await get_user_by_id(db_session, uid)
+        await db_session.refresh(refreshed)
+        assert refreshed.cash == 1000.0 * (i + 1)
+        holdings = await get_holdings(db_session, uid)
+        assert [(h.ticker, h.quantity) for h in holdings] == [("FUN", i + 1)]
+
+    # Existing holdings are updated in place, new tickers are inserted
+    users[1].portfolio = {"FUN": 7, "BAR": 3}
+    await sync_users_to_db(db_session, users[1:2])
+    await db_session.commit()
+    db_session.expire_all()
+    holdings = await get_holdings(db_session, ids[1])
+    assert sorted((h.ticker, h.quantity) for h in holdings) == [("BAR", 3), ("FUN", 7)]
+
+    # A sold-out ticker is no longer in the portfolio; its row is removed.
+    # The statement count doesn't grow with the number of users synced.
+    from sqlalchemy import event
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def listener(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    users[0].portfolio = {}
+    users[0].dirty = True
+    users[1].portfolio = {"FUN": 7}
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    try:
+        await sync_users_to_db(db_session, users)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+    await db_session.commit()
+    assert len(statements) == 3
+    assert not any("UPDATE portfolio_holdings" in sql for sql in statements)
+    assert await get_holdings(db_session, ids[0]) == []
+    assert [(h.ticker, h.quantity) for h in await get_holdings(db_session, ids[1])] == [
+        ("FUN", 7)
+    ]
+    assert [(h.ticker, h.quantity) for h in await get_holdings(db_session, ids[2])] == [
+        ("FUN", 3)
+    ]
+    assert not users[0].dirty
+
+
+@pytest.mark.asyncio
+async def test_upsert_holdings_past_bind_limit(db_session):
+    """More rows than the drivers' ~32k bound parameters still upsert, since
+    no single statement binds them all."""
+    from core.user import User
+    from db.crud import upsert_holdings
+    from db.models import PortfolioHolding
+    from sqlalchemy import event, func, select
+
+    bound = []
+    sync_engine = db_session.bind.sync_engine
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        bound.append(len(parameters[0]) if executemany else len(parameters))
+
+    user = User(portfolio={f"T{i}": 1 for i in range(12_000)})
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    try:
+        await upsert_holdings(db_session, [user])
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+    await db_session.commit()
+
+    assert max(bound) < 32_766
+    count = await db_session.scalar(select(func.count(PortfolioHolding.id)))
+    assert count == 12_000
+
+
+@pytest.mark.asyncio
+async def test_order_and_trade_rows_keep_event_time(db_session):
+    """Rows carry the placement/match time, not the time they were written."""
+    from datetime import datetime, timedelta, timezone
+
+    from core.trade import Trade
+    from db.crud import create_user, get_order_by_id, record_order, record_trades
+    from db.models import TradeModel
+    from sqlalchemy import select
+
+    uid = (await create_user(db_session, "event_time", "hash")).id
+    an_hour_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    order_id = str(uuid.uuid4())
+    await record_order(
+        db_session,
+        order_id=order_id,
+        user_id=uid,
+        ticker="FUN",
+        side="buy",
+        price=10.0,
+        quantity=1,
+        filled_quantity=1,
+        status="filled",
+        created_at=an_hour_ago,
+    )
+    trade = Trade(
+        ticker="FUN",
+        price=10.0,
+        quantity=1,
+        buyer_id=uuid.UUID(uid),
+        seller_id=uuid.UUID(uid),
+        timestamp=an_hour_ago.timestamp(),
+    )
+    await record_trades(db_session, [trade])
+    await db_session.commit()
+
+    order = await get_order_by_id(db_session, order_id)
+    row = (await db_session.execute(select(TradeModel))).scalar_one()
+    for created_at in (order.created_at, row.created_at):
+        assert created_at.replace(tzinfo=timezone.utc) == an_hour_ago
+
+
 @pytest.mark.asyncio
 async def test_ws_auth_with_valid_jwt():
     """_authenticate_ws returns user_id for a valid JWT."""
@@ -934,7 +1534,423 @@ async def test_ws_auth_with_api_key(client: AsyncClient):
     api_key = data["api_key"]
     user_id = data["user_id"]
 
+    from api import dependencies
     from main import _authenticate_ws
 
     result = await _authenticate_ws(api_key=api_key)
     assert result == user_id
+
+    # Same cache as HTTP auth: a key learned there needs no DB lookup here
+    dependencies._api_key_to_uid.clear()
+    resp = await client.get("/api/portfolio", headers={"X-API-Key": api_key})
+    assert resp.status_code == 200
+    assert dependencies._api_key_to_uid[api_key] == user_id
+    dependencies.remember_api_key("cached-only-key", user_id)
+    assert await _authenticate_ws(api_key="cached-only-key") == user_id
+    assert await _authenticate_ws(api_key="bogus") is None
+
+
+@pytest.mark.asyncio
+async def test_ws_broadcasts_coalesce_trade_bursts():
+    """Several trade batches in one burst produce one prices message."""
+    import asyncio
+    import json
+
+    from core.trade import Trade
+    from engine.exchange import Exchange
+    from ws.manager import ConnectionManager
+
+    class RecordingSocket:
+        def __init__(self):
+            self.messages = []
+
+        async def accept(self):
+            pass
+
+        async def send_text(self, text):
+            self.messages.append(json.loads(text))
+
+    exchange = Exchange()
+    exchange.add_ticker("FUN", initial_price=100.0)
+    ws_manager = ConnectionManager()
+    prices_ws, trades_ws = RecordingSocket(), RecordingSocket()
+    await ws_manager.connect(prices_ws, "prices")
+    await ws_manager.connect(trades_ws, "trades:FUN")
+
+    task = asyncio.create_task(ws_manager.run(exchange))
+    try:
+        for _ in range(3):
+            trade = Trade("FUN", 100.0, 1, uuid.uuid4(), uuid.uuid4())
+            ws_manager.notify_trades("FUN", [trade])
+        await asyncio.sleep(0.05)
+    finally:
+        task.cancel()
+
+    assert [m["type"] for m in trades_ws.messages] == ["trades"]
+    assert len(trades_ws.messages[0]["data"]) == 3
+    assert [m["type"] for m in prices_ws.messages] == ["prices"]
+
+
+@pytest.mark.asyncio
+async def test_ws_broadcast_isolates_slow_clients():
+    """A stalled client sheds its oldest messages without blocking others."""
+    import asyncio
+
+    from ws.manager import ConnectionManager
+
+    class Socket:
+        def __init__(self):
+            self.messages = []
+
+        async def accept(self):
+            pass
+
+        async def send_text(self, text):
+            self.messages.append(text)
+
+    class StalledSocket(Socket):
+        async def send_text(self, text):
+            await asyncio.Event().wait()
+
+    ws_manager = ConnectionManager()
+    fast, stalled = Socket(), StalledSocket()
+    await ws_manager.connect(stalled, "prices")
+    await ws_manager.connect(fast, "prices")
+
+    for i in range(50):
+        ws_manager._broadcast("prices", {"seq": i})
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.01)
+
+    assert len(fast.messages) == 50
+    outbox = ws_manager._outboxes[stalled]
+    assert outbox.full() and outbox.get_nowait() == '{"seq":18}'
+
+    ws_manager.disconnect(stalled, "prices")
+    ws_manager.disconnect(fast, "prices")
+    assert not ws_manager._relays
+
+
+@pytest.mark.asyncio
+async def test_ws_stalled_client_is_dropped_after_send_timeout():
+    """A send that never completes disconnects and closes the client."""
+    import asyncio
+
+    from ws.manager import ConnectionManager
+
+    class StalledSocket:
+        closed = False
+
+        async def accept(self):
+            pass
+
+        async def send_text(self, text):
+            await asyncio.Event().wait()
+
+        async def close(self):
+            self.closed = True
+
+    ws_manager = ConnectionManager()
+    ws_manager._send_timeout = 0.01
+    stalled = StalledSocket()
+    await ws_manager.connect(stalled, "prices")
+
+    ws_manager._broadcast("prices", {"seq": 0})
+    await asyncio.sleep(0.05)
+
+    assert stalled.closed
+    assert stalled not in ws_manager.channels["prices"]
+    assert not ws_manager._outboxes and not ws_manager._relays
+
+
+@pytest.mark.asyncio
+async def test_ws_orderbook_throttle_sends_trailing_update():
+    """A book change inside the throttle window still goes out, once."""
+    import asyncio
+    import json
+
+    from core.order import Order
+    from core.user import User
+    from engine.exchange import Exchange
+    from ws.manager import ConnectionManager
+
+    class RecordingSocket:
+        def __init__(self):
+            self.messages = []
+
+        async def accept(self):
+            pass
+
+        async def send_text(self, text):
+            self.messages.append(json.loads(text))
+
+    exchange = Exchange()
+    exchange.add_ticker("FUN", initial_price=100.0)
+    user = User(username="ob", cash=10_000.0)
+    exchange.register_user(user)
+    ws_manager = ConnectionManager()
+    ws_manager._orderbook_throttle = 0.05
+    socket = RecordingSocket()
+    await ws_manager.connect(socket, "orderbook:FUN")
+
+    await ws_manager.broadcast_orderbook("FUN", exchange)
+    for price in (99.0, 98.0):
+        order = Order(price=price, quantity=1, user_id=user.user_id)
+        await exchange.place_order("FUN", order, "buy")
+        await ws_manager.broadcast_orderbook("FUN", exchange)
+    await asyncio.sleep(0.1)
+
+    assert [len(m["bids"]) for m in socket.messages] == [0, 2]
+    ws_manager.disconnect(socket, "orderbook:FUN")
+
+
+@pytest.mark.asyncio
+async def test_ws_broadcasts_skip_channels_without_subscribers():
+    """No payload is built for a channel nobody is subscribed to."""
+    from ws.manager import ConnectionManager
+
+    ws_manager = ConnectionManager()
+    unused = object()  # any attribute access would raise
+    await ws_manager.broadcast_trades("FUN", [unused])
+    await ws_manager.broadcast_prices(unused)
+    await ws_manager.broadcast_orderbook("FUN", unused)
+    assert not ws_manager._orderbook_timers
+    assert not ws_manager.channels
+
+
+def test_decode_jwt_cache_respects_expiry(monkeypatch):
+    """A cached JWT is rejected once its exp claim passes."""
+    import time
+
+    from api import dependencies
+    from api.dependencies import create_jwt, decode_jwt
+
+    user_id = str(uuid.uuid4())
+    token = create_jwt(user_id)
+    assert decode_jwt(token) == user_id
+    assert decode_jwt(token) == user_id  # served from cache
+
+    future = time.time() + 48 * 3600
+    monkeypatch.setattr(dependencies.time, "time", lambda: future)
+    assert decode_jwt(token) is None
+
+
+@pytest.mark.asyncio
+async def test_api_key_lookup_cached(client: AsyncClient):
+    """API keys resolve from the in-memory cache, not the DB, after register."""
+    from api import dependencies
+
+    resp = await client.post(
+        "/api/register",
+        json={"username": "cache_user", "password": "pass1234"},
+    )
+    data = resp.json()
+    assert dependencies._api_key_to_uid[data["api_key"]] == data["user_id"]
+
+    resp = await client.get("/api/portfolio", headers={"X-API-Key": data["api_key"]})
+    assert resp.status_code == 200
+    assert resp.json()["user_id"] == data["user_id"]
+
+    resp = await client.get("/api/portfolio", headers={"X-API-Key": "bogus"})
+    assert resp.status_code == 401
+    assert "bogus" not in dependencies._api_key_to_uid
+
+
+@pytest.mark.asyncio
+async def test_background_writer_persists_before_reads(client: AsyncClient, tmp_path):
+    """With the DB writer running, queued writes land before reads see them."""
+
+    from api.dependencies import set_db_writer
+    from db import database as db_module
+    from db.models import Base
+    from db.writer import DBWriter
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    # The shared in-memory engine has a single connection; the writer needs
+    # its own, as it would against a real database file
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/writer.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    original_session = db_module.async_session
+    db_module.async_session = session_factory
+
+    writer = DBWriter(session_factory)
+    task = writer.start()
+    set_db_writer(writer)
+    try:
+        resp = await client.post(
+            "/api/register",
+            json={"username": "writer_user", "password": "pass1234"},
+        )
+        headers = {"X-API-Key": resp.json()["api_key"]}
+
+        resp = await client.post(
+            "/api/orders",
+            json={"ticker": "FUN", "side": "buy", "price": 50.0, "quantity": 2},
+            headers=headers,
+        )
+        order_id = resp.json()["order_id"]
+
+        resp = await client.get("/api/orders", headers=headers)
+        assert [o["order_id"] for o in resp.json()] == [order_id]
+
+        resp = await client.delete(f"/api/orders/{order_id}", headers=headers)
+        assert resp.status_code == 200
+        resp = await client.get("/api/orders", headers=headers)
+        assert resp.json() == []
+    finally:
+        set_db_writer(None)
+        task.cancel()
+        db_module.async_session = original_session
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_background_writer_drain_ignores_later_jobs(db_engine):
+    """drain() returns once earlier jobs commit, even under a steady stream."""
+    import asyncio
+
+    from db.writer import DBWriter
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    writer = DBWriter(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    done = []
+
+    async def job(session):
+        done.append(len(done))
+
+    writer.submit(job)
+    task = writer.start()
+
+    async def keep_submitting():
+        while True:
+            writer.submit(job)
+            await asyncio.sleep(0)
+
+    producer = asyncio.create_task(keep_submitting())
+    try:
+        await asyncio.wait_for(writer.drain(), 1)
+        assert done
+    finally:
+        producer.cancel()
+        task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_background_writer_drain_fails_when_worker_dies(db_engine):
+    """drain() raises instead of hanging once the worker is gone, and routes
+    stop handing jobs to it."""
+    import asyncio
+
+    from api.dependencies import get_db_writer, set_db_writer
+    from db.writer import DBWriter
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    writer = DBWriter(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+
+    async def stuck_job(session):
+        await asyncio.Event().wait()
+
+    task = writer.start()
+    writer.submit(stuck_job)
+    drain = asyncio.create_task(writer.drain())
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(drain, 1)
+    with pytest.raises(RuntimeError):
+        await writer.drain()
+
+    set_db_writer(writer)
+    try:
+        assert await get_db_writer() is None
+    finally:
+        set_db_writer(None)
+
+
+@pytest.mark.asyncio
+async def test_background_writer_retries_failed_job(db_engine, db_session):
+    """A failing job is retried, not dropped; jobs before it land at once and
+    jobs behind it wait, so writes still commit in submission order."""
+    import asyncio
+
+    from db.crud import create_user
+    from db.models import UserModel
+    from db.writer import DBWriter
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    writer = DBWriter(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False),
+        retry_delay=0.01,
+    )
+    failures = 2
+
+    async def flaky_job(session):
+        nonlocal failures
+        if failures:
+            failures -= 1
+            raise RuntimeError("boom")
+        await create_user(session, "writer_flaky", "hash")
+
+    def make_job(username):
+        async def job(session):
+            await create_user(session, username, "hash")
+
+        return job
+
+    writer.submit(make_job("writer_first"))
+    writer.submit(flaky_job)
+    writer.submit(make_job("writer_last"))
+    task = writer.start()
+    try:
+        # drain() returns once the failed write is parked, without waiting
+        # out the retries
+        await writer.drain()
+        assert writer.parked == 2
+        for _ in range(100):
+            if not writer.parked:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        task.cancel()
+
+    assert not writer.parked
+    result = await db_session.execute(
+        select(UserModel.username).where(UserModel.username.like("writer_%"))
+    )
+    assert sorted(result.scalars()) == ["writer_first", "writer_flaky", "writer_last"]
+
+
+@pytest.mark.asyncio
+async def test_background_writer_failed_sync_keeps_user_dirty(db_engine):
+    """A failed job leaves its users dirty so a later sync still writes them."""
+
+    from core.user import User
+    from db.crud import sync_users_to_db
+    from db.writer import DBWriter
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    writer = DBWriter(
+        async_sessionmaker(db_engine, class_=AsyncSession, expire_on_commit=False)
+    )
+    user = User(username="unsynced", dirty=True)
+
+    async def failing_sync(session):
+        await sync_users_to_db(session, [user])
+        raise RuntimeError("boom")
+
+    writer.submit(failing_sync)
+    task = writer.start()
+    await writer.drain()
+    task.cancel()
+
+    assert user.dirty
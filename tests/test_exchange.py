@@ -156,6 +156,53 @@ async def test_on_trades_callback(exchange, buyer, market_maker):
     assert len(callback_data[0][1]) == 1
 
 
+@pytest.mark.asyncio
+async def test_version_bumps_on_book_changes(exchange, buyer):
+    """Exchange.version changes whenever a book is mutated."""
+    v0 = exchange.version
+    order = Order(price=99.0, quantity=1, user_id=buyer.user_id)
+    await exchange.place_order("TEST", order, "buy")
+    v1 = exchange.version
+    assert v1 > v0
+
+    await exchange.cancel_order("TEST", order.order_id, "buy", buyer.user_id)
+    assert exchange.version > v1
+
+    # Cancelling nothing leaves the version alone
+    v2 = exchange.version
+    await exchange.cancel_all_for_user("TEST", buyer.user_id)
+    assert exchange.version == v2
+
+
+@pytest.mark.asyncio
+async def test_price_snapshot_falls_back_to_mid(exchange, market_maker):
+    """price_snapshot uses last trade, else bid/ask mid, else omits the ticker."""
+    exchange.add_ticker("NOPRICE")
+    assert exchange.price_snapshot() == {"TEST": 100.0}
+
+    bid = Order(price=9.0, quantity=1, user_id=market_maker.user_id)
+    await exchange.place_order("NOPRICE", bid, "buy")
+    ask = Order(price=11.0, quantity=1, user_id=market_maker.user_id)
+    await exchange.place_order("NOPRICE", ask, "sell")
+    assert exchange.price_snapshot() == {"TEST": 100.0, "NOPRICE": 10.0}
+    assert exchange.quote_snapshot()["NOPRICE"]["current_price"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_quote_snapshot_reused_until_book_changes(exchange, buyer):
+    first = exchange.quote_snapshot()
+    assert first == {
+        "TEST": {"current_price": 100.0, "best_bid": None, "best_ask": None}
+    }
+    assert exchange.quote_snapshot() is first
+    assert exchange.get_exchange_stats()["TEST"]["total_bids"] == 0
+
+    order = Order(price=99.0, quantity=1, user_id=buyer.user_id)
+    await exchange.place_order("TEST", order, "buy")
+    assert exchange.quote_snapshot()["TEST"]["best_bid"] == 99.0
+    assert exchange.get_exchange_stats()["TEST"]["total_bids"] == 1
+
+
 # --- Order cancellation tests ---
 
 
@@ -175,6 +222,77 @@ def test_orderbook_remove_order():
     assert book.remove_order(uuid.uuid4(), "buy") is None
 
 
+def test_orderbook_price_time_priority():
+    """Best price first; within a price, orders queue in arrival order."""
+    book = OrderBook("TEST")
+    first = Order(price=100.0, quantity=1, user_id=uuid.uuid4(), timestamp=5)
+    second = Order(price=100.0, quantity=1, user_id=uuid.uuid4(), timestamp=5)
+    better = Order(price=101.0, quantity=1, user_id=uuid.uuid4())
+    for order in (first, second, better):
+        book.add_order(order, "buy")
+
+    assert book.bids == [better, first, second]
+    assert book.best_order("buy") is better
+    assert book.best_price("sell") is None
+
+    # Equal price and timestamp: removal still picks the right order
+    assert book.remove_order(second.order_id, "buy") is second
+    assert [o.order_id for o in book.bids] == [better.order_id, first.order_id]
+    assert book.order_count("buy") == 2
+
+
+def test_orderbook_cancels_by_id_and_user():
+    book = OrderBook("TEST")
+    alice, bob = uuid.uuid4(), uuid.uuid4()
+    a_bid = Order(price=99.0, quantity=1, user_id=alice)
+    a_ask = Order(price=101.0, quantity=2, user_id=alice)
+    b_bid = Order(price=99.0, quantity=3, user_id=bob)
+    book.add_order(a_bid, "buy")
+    book.add_order(a_ask, "sell")
+    book.add_order(b_bid, "buy")
+
+    # The id is only found on the side it rests on
+    assert book.remove_order(a_ask.order_id, "buy") is None
+
+    removed = book.remove_orders_by_user(alice)
+    assert sorted(side for _, side in removed) == ["buy", "sell"]
+    assert book.bids == [b_bid]
+    assert book.asks == []
+    assert book.remove_orders_by_user(alice) == []
+
+    # A filled order leaves the indexes too
+    book.fill_top("buy", 3)
+    assert book.remove_order(b_bid.order_id, "buy") is None
+    assert book.order_count("buy") == 0
+
+
+@pytest.mark.asyncio
+async def test_orderbook_price_levels_track_fills_and_cancels(
+    exchange, buyer, market_maker
+):
+    """Aggregated price levels stay in sync through add, fill, and cancel."""
+    for price, qty in ((101.0, 5), (101.0, 3), (102.0, 4)):
+        ask = Order(price=price, quantity=qty, user_id=market_maker.user_id)
+        await exchange.place_order("TEST", ask, "sell")
+    book = exchange.order_books["TEST"]
+    assert book.price_levels("sell") == [(101.0, 8), (102.0, 4)]
+    assert book.price_levels("sell", depth=1) == [(101.0, 8)]
+
+    # Fill 6 — consumes the first 101 order and 1 of the second
+    bid = Order(price=101.0, quantity=6, user_id=buyer.user_id)
+    await exchange.place_order("TEST", bid, "buy")
+    assert book.price_levels("sell") == [(101.0, 2), (102.0, 4)]
+
+    resting = Order(price=99.0, quantity=2, user_id=buyer.user_id)
+    await exchange.place_order("TEST", resting, "buy")
+    assert book.price_levels("buy") == [(99.0, 2)]
+
+    await exchange.cancel_order("TEST", resting.order_id, "buy", buyer.user_id)
+    await exchange.cancel_all_for_user("TEST", market_maker.user_id)
+    assert book.price_levels("buy") == []
+    assert book.price_levels("sell") == []
+
+
 @pytest.mark.asyncio
 async def test_cancel_buy_order(exchange, buyer):
     initial_cash = buyer.cash
@@ -315,6 +433,27 @@ async def test_sell_sweeps_multiple_bid_levels(exchange, seller, market_maker):
     assert seller.cash == initial_cash + 825.0
 
 
+@pytest.mark.asyncio
+async def test_escrowed_cash_tracks_resting_bids(exchange, buyer, seller):
+    """escrowed_cash follows resting bid placement, fills, and cancels."""
+    bid = Order(price=100.0, quantity=10, user_id=buyer.user_id)
+    await exchange.place_order("TEST", bid, "buy")
+    assert buyer.escrowed_cash == 1000.0
+
+    # Seller fills 4 of the resting bid
+    ask = Order(price=100.0, quantity=4, user_id=seller.user_id)
+    await exchange.place_order("TEST", ask, "sell")
+    assert buyer.escrowed_cash == 600.0
+
+    await exchange.cancel_order("TEST", bid.order_id, "buy", buyer.user_id)
+    assert buyer.escrowed_cash == 0.0
+
+    # IOC remainders never rest, so nothing stays escrowed
+    ioc = Order(price=100.0, quantity=5, user_id=buyer.user_id, time_in_force="IOC")
+    await exchange.place_order("TEST", ioc, "buy")
+    assert buyer.escrowed_cash == 0.0
+
+
 # --- Cancel all for user tests ---
 
 
@@ -512,3 +651,73 @@ async def test_fok_exact_fill(exchange, buyer, market_maker):
     assert buyer.portfolio["TEST"] == 5
     # Price improvement: escrowed 500, paid 475, refund 25
     assert buyer.cash == initial_cash - 475.0
+
+
+@pytest.mark.asyncio
+async def test_trade_id_strings(exchange, buyer, seller):
+    """Trades carry pre-formatted string IDs matching their UUIDs."""
+    ask = Order(price=100.0, quantity=2, user_id=seller.user_id)
+    await exchange.place_order("TEST", ask, "sell")
+    bid = Order(price=100.0, quantity=2, user_id=buyer.user_id)
+    trades, _ = await exchange.place_order("TEST", bid, "buy")
+
+    trade = trades[0]
+    assert trade.trade_id_str == str(trade.trade_id)
+    assert trade.buyer_id_str == buyer.user_id_str == str(buyer.user_id)
+    assert trade.seller_id_str == seller.user_id_str
+    assert trade.buy_order_id_str == bid.order_id_str
+    assert trade.sell_order_id_str == ask.order_id_str
+    # Reused from the orders rather than formatted again
+    assert trade.buy_order_id_str is bid.order_id_str
+
+
+@pytest.mark.asyncio
+async def test_selling_all_shares_drops_ticker(exchange, buyer, seller):
+    """A ticker whose holding reaches zero is removed from the portfolio."""
+    ask = Order(price=100.0, quantity=100, user_id=seller.user_id)
+    await exchange.place_order("TEST", ask, "sell")
+    assert "TEST" not in seller.portfolio
+
+    # Cancelling restores the escrowed shares
+    await exchange.cancel_order("TEST", ask.order_id, "sell", seller.user_id)
+    assert seller.portfolio == {"TEST": 100}
+
+
+def test_tickers_tuple_tracks_listings(exchange):
+    assert exchange.tickers == ("TEST",)
+    exchange.add_ticker("MORE")
+    exchange.add_ticker("TEST")  # already listed
+    assert exchange.tickers == ("TEST", "MORE")
+
+
+def test_match_result_accumulates_notional():
+    from engine.matching_engine import MatchingEngine
+
+    book = OrderBook("TEST")
+    seller = uuid.uuid4()
+    book.add_order(Order(price=10.0, quantity=2, user_id=seller), "sell")
+    book.add_order(Order(price=11.0, quantity=5, user_id=seller), "sell")
+
+    incoming = Order(price=12.0, quantity=4, user_id=uuid.uuid4())
+    trades, notional, filled = MatchingEngine(book).process_order(incoming, "buy")
+    assert [(t.price, t.quantity) for t in trades] == [(10.0, 2), (11.0, 2)]
+    assert notional == 42.0
+    assert filled == 4
+
+
+@pytest.mark.asyncio
+async def test_trades_and_cancels_mark_users_dirty(exchange, buyer, seller):
+    assert not buyer.dirty and not seller.dirty
+    await exchange.place_order(
+        "TEST", Order(price=100.0, quantity=1, user_id=seller.user_id), "sell"
+    )
+    seller.dirty = False
+    await exchange.place_order(
+        "TEST", Order(price=100.0, quantity=1, user_id=buyer.user_id), "buy"
+    )
+    # The resting seller was credited, so it needs syncing too
+    assert buyer.dirty and seller.dirty
+
+    buyer.dirty = False
+    await exchange.cancel_all_for_user("TEST", buyer.user_id)  # nothing resting
+    assert not buyer.dirty